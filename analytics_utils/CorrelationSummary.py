@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+This is the find module.
+The find module supplies one class,
+    CorrelationSummary
+"""
+
+import pandas as pd
+import numpy as np
+
+
+# Mergeable co-moments kept by the summary, one (headers, headers) matrix each
+_COMOMENTS = ("count", "mean", "m2", "cov")
+
+
+class CorrelationSummary:
+    def __init__(
+        self, data_frame: pd.DataFrame = None, headers: [str] = None
+    ):
+        """Mergeable partial state of the Pearson correlation of correlate,
+        with pairwise NaNs. Holds, for each pair (a, b) of headers, over the
+        rows where both are non-NaN: their count, the mean and the sum of the
+        squared deviations of a (those of b are the transposed matrices) and
+        the sum of the cross deviations. Summaries of disjoint shards of rows
+        can be merged and finalized into the correlate output without moving
+        the raw rows.
+
+        A chunk is summarized with matrix products over its centered values
+        and the masks of its NaNs, and the summaries are merged exactly with
+        the pairwise formulas of Chan et al., so the memory is bounded by four
+        (headers, headers) matrices plus a chunk.
+
+        Parameters
+        ----------
+        data_frame : pd.DataFrame, optional
+            Rows to summarize, by default None
+        headers : [str], optional
+            Chosen dataframe headers, by default the numeric and boolean
+            columns of data_frame
+
+        Raises
+        ------
+        ValueError
+            Neither data_frame nor headers given
+        """
+        if headers is None:
+            if data_frame is None:
+                raise ValueError("data_frame or headers must be given")
+            headers = data_frame.select_dtypes(
+                include=["number", "bool"]
+            ).columns
+        self.headers = list(headers)
+
+        size = len(self.headers)
+        self._comoments = {
+            "count": np.zeros((size, size), dtype=np.int64),
+            "mean": np.zeros((size, size)),
+            "m2": np.zeros((size, size)),
+            "cov": np.zeros((size, size)),
+        }
+
+        if data_frame is not None:
+            self.update(data_frame)
+
+    @staticmethod
+    def _merge(comoments: dict, other: dict) -> dict:
+        count = comoments["count"] + other["count"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(
+                count > 0, comoments["count"] * other["count"] / count, 0
+            )
+            share = np.where(count > 0, other["count"] / count, 0)
+        delta = other["mean"] - comoments["mean"]
+        return {
+            "count": count,
+            "mean": comoments["mean"] + delta * share,
+            "m2": comoments["m2"] + other["m2"] + delta * delta * weight,
+            "cov": comoments["cov"] + other["cov"] + delta * delta.T * weight,
+        }
+
+    def update(self, data_frame: pd.DataFrame) -> "CorrelationSummary":
+        """Adds rows to the summary
+
+        Parameters
+        ----------
+        data_frame : pd.DataFrame
+            Rows with the summary headers (or a 2-D array with the headers in
+            order)
+
+        Returns
+        -------
+        CorrelationSummary
+            The summary itself
+        """
+        if isinstance(data_frame, pd.DataFrame):
+            data_frame = data_frame.loc[:, self.headers]
+        values = np.asarray(data_frame, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        if not len(values):
+            return self
+
+        # Centered on the column means of the chunk, 0 at the NaNs, to limit
+        # the cancellation of the sums
+        mask = ~np.isnan(values)
+        weights = mask.astype(np.float64)
+        count = weights.T @ weights
+        shift = np.where(mask, values, 0).sum(axis=0) / np.maximum(
+            mask.sum(axis=0), 1
+        )
+        x = np.where(mask, values - shift, 0)
+        sums = x.T @ weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, sums / count, 0)
+        chunk = {
+            "count": count.round().astype(np.int64),
+            "mean": shift[:, None] + mean,
+            "m2": (x * x).T @ weights - sums * mean,
+            "cov": x.T @ x - sums * mean.T,
+        }
+        self._comoments = self._merge(self._comoments, chunk)
+        return self
+
+    def merge(self, other: "CorrelationSummary") -> "CorrelationSummary":
+        """Merges the summary of other rows into this one
+
+        Parameters
+        ----------
+        other : CorrelationSummary
+            Summary with the same headers
+
+        Returns
+        -------
+        CorrelationSummary
+            The summary itself
+
+        Raises
+        ------
+        ValueError
+            Summaries with different headers
+        """
+        if other.headers != self.headers:
+            raise ValueError(
+                "summaries with different headers can not be merged"
+            )
+        self._comoments = self._merge(self._comoments, other._comoments)
+        return self
+
+    def _result(self, min_periods: int = 1) -> np.ndarray:
+        count, m2 = self._comoments["count"], self._comoments["m2"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = self._comoments["cov"] / np.sqrt(m2 * m2.T)
+        result[count < max(min_periods, 1)] = np.nan
+        # A column is fully correlated with itself
+        diagonal = result.diagonal()
+        np.fill_diagonal(result, np.where(np.isnan(diagonal), np.nan, 1))
+        return result
+
+    def finalize(self, min_periods: int = 1) -> pd.DataFrame:
+        """Correlation matrix of all the rows summarized, as correlate
+
+        Parameters
+        ----------
+        min_periods : int, optional
+            Minimum number of rows of a pair, by default 1
+
+        Returns
+        -------
+        pd.DataFrame
+            Correlation matrix
+        """
+        return pd.DataFrame(
+            self._result(min_periods), index=self.headers, columns=self.headers
+        )
+
+    def to_dict(self) -> dict:
+        """Serializable (JSON compatible) state of the summary
+
+        Returns
+        -------
+        dict
+            State, see CorrelationSummary.from_dict
+        """
+        return {
+            "headers": self.headers,
+            "comoments": {_: self._comoments[_].tolist() for _ in _COMOMENTS},
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "CorrelationSummary":
+        """Rebuilds a summary from its state
+
+        Parameters
+        ----------
+        state : dict
+            State returned by CorrelationSummary.to_dict
+
+        Returns
+        -------
+        CorrelationSummary
+            Summary
+        """
+        summary = cls(headers=state["headers"])
+        for _ in _COMOMENTS:
+            summary._comoments[_] = np.asarray(
+                state["comoments"][_], dtype=summary._comoments[_].dtype
+            ).reshape(summary._comoments[_].shape)
+        return summary
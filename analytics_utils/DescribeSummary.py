@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+This is the find module.
+The find module supplies one class,
+    DescribeSummary
+"""
+
+from analytics_utils.QuantileSketch import QuantileSketch
+from analytics_utils._moments import (
+    FIRST_QUARTILE,
+    THIRD_QUARTILE,
+    _STATS,
+    _merge_moments,
+    _moments,
+    _index,
+    _frame,
+    _stats,
+)
+from analytics_utils.lang import Lang
+import pandas as pd
+import numpy as np
+
+
+# Mergeable moments kept by the summary
+_MOMENTS = ("count", "nans", "min", "max", "mean", "m2", "m3", "m4")
+
+
+class DescribeSummary:
+    def __init__(
+        self,
+        data_frame: pd.DataFrame = None,
+        headers: [str] = None,
+        k: int = 1000,
+    ):
+        """Mergeable partial state of describe_data. Holds, for each header,
+        the count, NaN count, min, max, mean and the sums of the central
+        powers up to order 4, plus a QuantileSketch. Summaries of disjoint
+        shards of rows can be merged and finalized into the describe_data
+        output without moving the raw rows.
+
+        The moments are merged exactly. The median, quartiles, limits and
+        mean absolute deviation come from the sketches, exact while a header
+        holds no more than k values (see QuantileSketch for the error bound).
+
+        Parameters
+        ----------
+        data_frame : pd.DataFrame, optional
+            Rows to summarize, by default None
+        headers : [str], optional
+            Chosen dataframe headers, by default the data_frame columns
+        k : int, optional
+            Accuracy of the sketches, see QuantileSketch, by default 1000
+
+        Raises
+        ------
+        ValueError
+            Neither data_frame nor headers given
+        """
+        if headers is None:
+            if data_frame is None:
+                raise ValueError("data_frame or headers must be given")
+            headers = data_frame.columns
+        self.headers = list(headers)
+        self.k = k
+
+        size = len(self.headers)
+        self._moments = {
+            "count": np.zeros(size, dtype=np.int64),
+            "nans": np.zeros(size, dtype=np.int64),
+            "min": np.full(size, np.nan),
+            "max": np.full(size, np.nan),
+            "mean": np.zeros(size),
+            "m2": np.zeros(size),
+            "m3": np.zeros(size),
+            "m4": np.zeros(size),
+        }
+        self._sketches = [QuantileSketch(k) for _ in self.headers]
+
+        if data_frame is not None:
+            self.update(data_frame)
+
+    def update(self, data_frame: pd.DataFrame) -> "DescribeSummary":
+        """Adds rows to the summary
+
+        Parameters
+        ----------
+        data_frame : pd.DataFrame
+            Rows with the summary headers (or a 2-D array with the headers in
+            order)
+
+        Returns
+        -------
+        DescribeSummary
+            The summary itself
+        """
+        if isinstance(data_frame, pd.DataFrame):
+            data_frame = data_frame.loc[:, self.headers]
+        values = np.asarray(data_frame, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+
+        self._moments = _merge_moments(self._moments, _moments(values))
+        for sketch, column in zip(self._sketches, values.T):
+            sketch.update(column)
+        return self
+
+    def merge(self, other: "DescribeSummary") -> "DescribeSummary":
+        """Merges the summary of other rows into this one
+
+        Parameters
+        ----------
+        other : DescribeSummary
+            Summary with the same headers and k
+
+        Returns
+        -------
+        DescribeSummary
+            The summary itself
+
+        Raises
+        ------
+        ValueError
+            Summaries with different headers or k
+        """
+        if other.headers != self.headers or other.k != self.k:
+            raise ValueError(
+                "summaries with different headers or k can not be merged"
+            )
+        self._moments = _merge_moments(self._moments, other._moments)
+        for sketch, other_sketch in zip(self._sketches, other._sketches):
+            sketch.merge(other_sketch)
+        return self
+
+    def _result(self) -> np.ndarray:
+        quartiles = [FIRST_QUARTILE, 0.5, THIRD_QUARTILE]
+        q1, median, q3 = (
+            np.array([_.quantile(quartiles) for _ in self._sketches])
+            .reshape(-1, 3)
+            .T
+        )
+        mad = np.array(
+            [
+                sketch.mean_absolute_deviation(mean)
+                for sketch, mean in zip(self._sketches, self._moments["mean"])
+            ]
+        )
+        return _stats(self._moments, q1, median, q3, mad)
+
+    def finalize(
+        self, lang: str = "pt", raw: bool = False
+    ) -> pd.DataFrame or (np.ndarray, pd.Index, tuple):
+        """Descriptions of all the rows summarized, as describe_data
+
+        Parameters
+        ----------
+        lang : str, optional
+            Output language, by default "pt"
+        raw : bool, optional
+            Return the unlabelled matrix instead of the dataframe, as
+            describe_data, by default False
+
+        Returns
+        -------
+        pd.DataFrame or (np.ndarray, pd.Index, tuple)
+            Dataframe with the descriptions, or with raw the float64 matrix
+            of shape (headers, statistics), the headers and the statistics
+            keys
+        """
+        if raw:
+            return self._result(), _index(self.headers), _STATS
+        return _frame(self._result(), self.headers, Lang(lang))
+
+    def to_dict(self) -> dict:
+        """Serializable (JSON compatible) state of the summary
+
+        Returns
+        -------
+        dict
+            State, see DescribeSummary.from_dict
+        """
+        return {
+            "headers": self.headers,
+            "k": self.k,
+            "moments": {_: self._moments[_].tolist() for _ in _MOMENTS},
+            "sketches": [_.to_dict() for _ in self._sketches],
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "DescribeSummary":
+        """Rebuilds a summary from its state
+
+        Parameters
+        ----------
+        state : dict
+            State returned by DescribeSummary.to_dict
+
+        Returns
+        -------
+        DescribeSummary
+            Summary
+        """
+        summary = cls(headers=state["headers"], k=state["k"])
+        for _ in _MOMENTS:
+            summary._moments[_] = np.asarray(
+                state["moments"][_], dtype=summary._moments[_].dtype
+            )
+        summary._sketches = [
+            QuantileSketch.from_dict(_) for _ in state["sketches"]
+        ]
+        return summary
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+This is the find module.
+The find module supplies one class,
+    IncrementalDescriber
+"""
+
+from analytics_utils.DescribeSummary import DescribeSummary
+import pandas as pd
+
+
+class IncrementalDescriber(DescribeSummary):
+    def __init__(
+        self,
+        data_frame: pd.DataFrame = None,
+        headers: [str] = None,
+        k: int = 1000,
+    ):
+        """Stateful describe_data of a live series. Seeded from an initial
+        dataframe, it takes the appended rows with update, at a cost that
+        depends on the new rows only (not on the history), and returns the
+        describe_data frame of all the rows seen with result.
+
+        The state is a DescribeSummary (exact moments, sketched order
+        statistics), so it can be pickled (or saved with to_dict) to survive
+        process restarts.
+
+        Parameters
+        ----------
+        data_frame : pd.DataFrame, optional
+            Initial rows, by default None
+        headers : [str], optional
+            Chosen dataframe headers, by default the data_frame columns
+        k : int, optional
+            Accuracy of the sketches, see QuantileSketch, by default 1000
+        """
+        super().__init__(data_frame, headers, k)
+
+    def update(self, new_rows: pd.DataFrame) -> "IncrementalDescriber":
+        """Adds the appended rows
+
+        Parameters
+        ----------
+        new_rows : pd.DataFrame
+            New rows, a pd.Series (or dict) for a single row
+
+        Returns
+        -------
+        IncrementalDescriber
+            The describer itself
+        """
+        if isinstance(new_rows, (pd.Series, dict)):
+            new_rows = [[new_rows[_] for _ in self.headers]]
+        return super().update(new_rows)
+
+    def result(self, lang: str = "pt") -> pd.DataFrame:
+        """Descriptions of all the rows seen, as describe_data
+
+        Parameters
+        ----------
+        lang : str, optional
+            Output language, by default "pt"
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe with the descriptions
+        """
+        return self.finalize(lang)
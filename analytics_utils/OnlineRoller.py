@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+This is the find module.
+The find module supplies one class,
+    OnlineRoller
+"""
+
+from analytics_utils.roll import _roll_block, _roll_state, _roll_types
+import pandas as pd
+import numpy as np
+
+
+class OnlineRoller:
+    def __init__(
+        self, window: int, stats: [str] = None, headers: [str] = None
+    ):
+        """Stateful roll of a live series, taking one row at a time. Each
+        push updates the running state of the window (compensated sums,
+        moments, monotonic deques for the min and max, indexable skiplist for
+        the median and quantiles) in O(1) amortized time (O(log window) for
+        the median and quantiles) and returns the current statistics, equal
+        to the last row of roll.
+
+        The state is a set of arrays: the rows of the last window are kept in
+        a buffer of twice the window, moved back when it fills up, next to
+        the engine state of roll. It can be saved with snapshot and rebuilt
+        with restore.
+
+        Parameters
+        ----------
+        window : int
+            Size of the moving window, see roll
+        stats : [str], optional
+            Statistics, see the roll_type of roll, by default ["mean", "var",
+            "std", "min", "max"]
+        headers : [str], optional
+            Headers of the pushed rows, by default the index (or keys) of the
+            first row pushed, or its positions
+        """
+        if stats is None:
+            stats = ["mean", "var", "std", "min", "max"]
+        self.window = window
+        self.stats = list(stats)
+        self.headers = None if headers is None else list(headers)
+        self._codes, self._qs, self.labels = _roll_types(self.stats)
+        self._row = 0
+        self._filled = 0
+        self._buffer = None
+        self._engine = None
+        self._values = None
+        if self.headers is not None:
+            self._start()
+
+    def _start(self):
+        size = len(self.headers)
+        self._buffer = np.empty((size, 2 * self.window))
+        state = _roll_state(size, [self.window], self._codes)
+        self._engine = state["engines"][0]
+
+    def push(self, row) -> np.ndarray:
+        """Adds the next row
+
+        Parameters
+        ----------
+        row : pd.Series, dict or sequence
+            Values of the row, a sequence in the headers order
+
+        Returns
+        -------
+        np.ndarray
+            Float64 matrix of shape (headers, stats) with the statistics of
+            the current window
+        """
+        if self.headers is None:
+            self.headers = (
+                list(row.keys())
+                if isinstance(row, (pd.Series, dict))
+                else list(range(len(row)))
+            )
+            self._start()
+        if isinstance(row, (pd.Series, dict)):
+            row = [row[_] for _ in self.headers]
+
+        if self._filled == self._buffer.shape[1]:
+            # Keeps only the rows of the last window
+            last = slice(self.window, None)
+            self._buffer[:, : self.window] = self._buffer[:, last]
+            self._filled = self.window
+        self._buffer[:, self._filled] = row
+        self._filled += 1
+        self._row += 1
+
+        end = np.array([self._row], np.int64)
+        self._values = _roll_block(
+            self._buffer,
+            self._row - self._filled,
+            np.maximum(end - self.window, 0),
+            end,
+            self.window,
+            self._codes,
+            self._qs,
+            self._engine["floats"],
+            self._engine["ints"],
+            self._engine["deques"],
+            self._engine["nodes"],
+            self._engine["links"],
+        )[:, :, 0]
+        return self._values
+
+    def result(self) -> pd.DataFrame:
+        """Statistics of the current window, as returned by the last push
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe indexed by the headers, with a column per statistic
+        """
+        values = self._values
+        if values is None:
+            values = np.full(
+                (len(self.headers or ()), len(self.labels)), np.nan
+            )
+        return pd.DataFrame(values, index=self.headers, columns=self.labels)
+
+    def snapshot(self) -> dict:
+        """Serializable (JSON compatible) state of the roller
+
+        Returns
+        -------
+        dict
+            State, see OnlineRoller.restore
+        """
+        state = {
+            "window": self.window,
+            "stats": self.stats,
+            "headers": self.headers,
+            "row": self._row,
+        }
+        if self._values is not None:
+            state["values"] = self._values.tolist()
+        if self._engine is not None:
+            tail = slice(max(self._filled - self.window, 0), self._filled)
+            state["tail"] = self._buffer[:, tail].tolist()
+            state.update({_: self._engine[_].tolist() for _ in self._engine})
+        return state
+
+    @classmethod
+    def restore(cls, state: dict) -> "OnlineRoller":
+        """Rebuilds a roller from its state
+
+        Parameters
+        ----------
+        state : dict
+            State returned by OnlineRoller.snapshot
+
+        Returns
+        -------
+        OnlineRoller
+            Roller
+        """
+        roller = cls(
+            state["window"],
+            [tuple(_) if isinstance(_, list) else _ for _ in state["stats"]],
+            state["headers"],
+        )
+        roller._row = state["row"]
+        if "values" in state:
+            roller._values = np.asarray(state["values"], dtype=np.float64)
+        if roller._engine is not None:
+            tail = np.asarray(state["tail"], dtype=np.float64)
+            roller._filled = tail.shape[1]
+            roller._buffer[:, : roller._filled] = tail
+            for _ in roller._engine:
+                roller._engine[_] = np.asarray(
+                    state[_], dtype=roller._engine[_].dtype
+                )
+        return roller
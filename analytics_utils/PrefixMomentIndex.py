@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+This is the find module.
+The find module supplies one class,
+    PrefixMomentIndex
+"""
+
+from analytics_utils._moments import _STATS, _frame
+from analytics_utils.lang import Lang
+import pandas as pd
+import numpy as np
+
+
+# Statistics answered by the index, in describe_data order
+_RANGE_STATS = (
+    "max",
+    "min",
+    "mean",
+    "var",
+    "std",
+    "amp",
+    "rms",
+    "count",
+    "nans",
+)
+
+
+def _centered(count, shift, s1, s2) -> tuple:
+    """(count, mean, m2) moments from the sums of the values centered on
+    shift and of their squares"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        offset = np.where(count > 0, s1 / count, 0)
+    return count, shift + offset, np.maximum(s2 - s1 * offset, 0)
+
+
+def _merge(a: tuple, b: tuple) -> tuple:
+    """(count, mean, m2) moments of the union of two disjoint sets of rows,
+    with the pairwise formulas of Chan et al."""
+    count = a[0] + b[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(count > 0, b[0] / count, 0)
+    delta = b[1] - a[1]
+    return (
+        count,
+        a[1] + delta * share,
+        a[2] + b[2] + delta * delta * a[0] * share,
+    )
+
+
+def _runs(moments: tuple, shift: np.ndarray, half: int) -> tuple:
+    """Level of the disjoint sparse table for runs of 2 * half blocks: the
+    moments from each block of the first half of its run to the middle, and
+    from the middle to each block of the second half. Both halves are
+    accumulated outwards from the middle, centered on the block next to it"""
+    n_blocks, n_cols = moments[0].shape
+    size = 2 * half
+    padding = ((0, -n_blocks % size), (0, 0))
+
+    def _halves(a):
+        a = np.pad(a, padding, mode="constant")
+        return _flip(a.reshape(-1, 2, half, n_cols))
+
+    def _flip(a):
+        a[:, 0] = a[:, 0, ::-1]
+        return a
+
+    count, mean, m2, shift = map(_halves, moments + (shift[:n_blocks],))
+    shift = shift[:, :, :1]
+    delta = mean - shift
+    level = _centered(
+        np.cumsum(count, axis=2),
+        shift,
+        np.cumsum(count * delta, axis=2),
+        np.cumsum(m2 + count * delta * delta, axis=2),
+    )
+    return tuple(_flip(_).reshape(-1, n_cols)[:n_blocks] for _ in level)
+
+
+class PrefixMomentIndex:
+    def __init__(
+        self,
+        data_frame: pd.DataFrame,
+        headers: [str] = None,
+        block_size: int = 64,
+    ):
+        """Index precomputed once from a dataframe to answer the max, min,
+        mean, variance, standard deviation, amplitude, rms, count and NaNs of
+        any range of rows without rescanning it.
+
+        The rows are split in blocks of block_size rows, each one centered on
+        its own mean. Cumulative sums of the centered x and x², restarted at
+        each block, stay small and answer, with those of the NaN counts, the
+        partial blocks at the ends of a range in O(1) without cancellation,
+        even on a drifting series. The
+        full blocks between them come from a disjoint sparse table of the
+        (count, mean, m2) of runs of blocks, merged with the pairwise formulas
+        of Chan et al., and the min and max from a sparse table over the
+        minima and maxima of the blocks (both O(1)).
+
+        Parameters
+        ----------
+        data_frame : pd.DataFrame
+            Input dataframe
+        headers : [str], optional
+            Chosen dataframe headers, by default None
+        block_size : int, optional
+            Rows per block of the tables, by default 64
+        """
+        if not headers:
+            headers = data_frame.columns
+        self.headers = list(headers)
+        self.index = data_frame.index
+        self.block_size = block_size
+
+        values = data_frame.loc[:, self.headers].to_numpy(dtype=np.float64)
+        self._values = values
+        mask = np.isnan(values)
+        n_rows, n_cols = values.shape
+
+        # Each block is shifted by its mean, or by the one of the nearest
+        # block with values, so the runs of blocks are centered close too
+        firsts = np.arange(0, n_rows, block_size)
+        self._shift = np.zeros((len(firsts), n_cols))
+        if n_rows:
+            count = np.add.reduceat(~mask, firsts, axis=0)
+            blocks = np.arange(len(firsts))[:, None]
+            before = np.maximum.accumulate(np.where(count > 0, blocks, -1))
+            after = np.minimum.accumulate(
+                np.where(count > 0, blocks, len(firsts) - 1)[::-1]
+            )[::-1]
+            nearest = np.where(before >= 0, before, after)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.add.reduceat(
+                    np.where(mask, 0.0, values), firsts, axis=0
+                ) / count
+            self._shift = np.nan_to_num(
+                np.take_along_axis(mean, nearest, axis=0)
+            )
+        shift = np.repeat(self._shift, block_size, axis=0)[:n_rows]
+        centered = np.where(mask, 0.0, values - shift)
+        centered = np.pad(
+            centered,
+            ((0, len(firsts) * block_size - n_rows), (0, 0)),
+            mode="constant",
+        ).reshape(len(firsts), block_size, n_cols)
+
+        # The sums of a row cover its block up to it (included)
+        zeros = np.zeros((1, n_cols))
+        self._nans = np.concatenate((zeros, np.cumsum(mask, axis=0)))
+        self._sum = np.concatenate(
+            (zeros, np.cumsum(centered, axis=1).reshape(-1, n_cols)[:n_rows])
+        )
+        self._sum2 = np.concatenate(
+            (
+                zeros,
+                np.cumsum(centered * centered, axis=1).reshape(-1, n_cols)[
+                    :n_rows
+                ],
+            )
+        )
+
+        # Disjoint sparse table: level 0 holds the moments of each block,
+        # level j those of the runs of 2^j blocks (see _runs)
+        n_blocks = n_rows // block_size
+        starts = firsts[:n_blocks]
+        stops = starts + block_size
+        moments = _centered(
+            block_size - (self._nans[stops] - self._nans[starts]),
+            self._shift[:n_blocks],
+            self._sum[stops],
+            self._sum2[stops],
+        )
+        self._moment_table = [moments]
+        half = 1
+        while half < n_blocks:
+            self._moment_table.append(_runs(moments, self._shift, half))
+            half *= 2
+
+        # Sparse tables: level j holds the extreme of 2^j consecutive blocks
+        n_blocks = n_rows // block_size
+        blocks = values[: n_blocks * block_size].reshape(
+            n_blocks, block_size, n_cols
+        )
+        self._min_table = [np.fmin.reduce(blocks, axis=1)]
+        self._max_table = [np.fmax.reduce(blocks, axis=1)]
+        width = 1
+        while 2 * width <= n_blocks:
+            low, high = self._min_table[-1], self._max_table[-1]
+            self._min_table.append(np.fmin(low[:-width], low[width:]))
+            self._max_table.append(np.fmax(high[:-width], high[width:]))
+            width *= 2
+
+    def _position(self, key, default: int) -> int:
+        if key is None:
+            return default
+        if isinstance(key, (int, np.integer)):
+            return min(max(int(key), 0), len(self.index))
+        if not self.index.is_monotonic_increasing:
+            raise ValueError("label ranges need a sorted index")
+        return int(self.index.searchsorted(key))
+
+    def _extremes(self, start: int, end: int, columns: np.ndarray):
+        first = -(-start // self.block_size)
+        last = end // self.block_size
+        if first >= last:
+            block = self._values[start:end, columns]
+            return np.fmin.reduce(block), np.fmax.reduce(block)
+
+        level = int(np.log2(last - first))
+        other = last - 2 ** level
+        mins, maxs = self._min_table[level], self._max_table[level]
+        _min = np.fmin(mins[first, columns], mins[other, columns])
+        _max = np.fmax(maxs[first, columns], maxs[other, columns])
+        for rows in (
+            slice(start, first * self.block_size),
+            slice(last * self.block_size, end),
+        ):
+            block = self._values[rows, columns]
+            _min = np.fmin(_min, np.fmin.reduce(block, initial=np.nan))
+            _max = np.fmax(_max, np.fmax.reduce(block, initial=np.nan))
+        return _min, _max
+
+    def _partial(self, start: int, end: int, columns: np.ndarray) -> tuple:
+        """Moments of the rows in [start, end), inside a single block"""
+        if end <= start:
+            zeros = np.zeros(len(columns))
+            return zeros, zeros, zeros
+        nans = self._nans[end, columns] - self._nans[start, columns]
+        s1, s2 = self._sum[end, columns], self._sum2[end, columns]
+        if start % self.block_size:
+            s1 = s1 - self._sum[start, columns]
+            s2 = s2 - self._sum2[start, columns]
+        return _centered(
+            (end - start) - nans,
+            self._shift[start // self.block_size, columns],
+            s1,
+            s2,
+        )
+
+    def _blocks(self, first: int, last: int, columns: np.ndarray) -> tuple:
+        """Moments of the blocks first to last (included)"""
+        if first == last:
+            return tuple(_[first, columns] for _ in self._moment_table[0])
+        # The runs of the highest level splitting first and last
+        level = self._moment_table[(first ^ last).bit_length()]
+        return _merge(
+            tuple(_[first, columns] for _ in level),
+            tuple(_[last, columns] for _ in level),
+        )
+
+    def query(
+        self, start=None, end=None, headers: [str] = None, lang: str = "pt"
+    ) -> pd.DataFrame:
+        """Describes the rows in [start, end)
+
+        Parameters
+        ----------
+        start : int or label, optional
+            First row, a position (int) or an index label of a sorted index
+            (e.g. a timestamp), by default the first row
+        end : int or label, optional
+            Row after the last one, a position (int) or an index label, by
+            default after the last row
+        headers : [str], optional
+            Chosen headers among the indexed ones, by default all
+        lang : str, optional
+            Output language, by default "pt"
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe with the descriptions, with the describe_data labels
+
+        Raises
+        ------
+        ValueError
+            Label range over an unsorted index
+        """
+        if not headers:
+            headers = self.headers
+        columns = np.array([self.headers.index(_) for _ in headers], int)
+        start = self._position(start, 0)
+        end = max(self._position(end, len(self.index)), start)
+
+        # Partial blocks at both ends, and the full blocks between them
+        first = -(-start // self.block_size)
+        last = end // self.block_size
+        middle = min(first * self.block_size, end)
+        moments = _merge(
+            self._partial(start, middle, columns),
+            self._partial(max(last * self.block_size, middle), end, columns),
+        )
+        if first < last:
+            moments = _merge(moments, self._blocks(first, last - 1, columns))
+        count, mean, m2 = moments
+
+        nans = self._nans[end, columns] - self._nans[start, columns]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, mean, np.nan)
+            var = np.where(count > 1, m2 / (count - 1), np.nan)
+            rms = np.sqrt(mean * mean + m2 / count)
+        if end > start:
+            _min, _max = self._extremes(start, end, columns)
+        else:
+            _min = _max = np.full(len(columns), np.nan)
+        stats = {
+            "max": _max,
+            "min": _min,
+            "mean": mean,
+            "var": var,
+            "std": np.sqrt(var),
+            "amp": _max - _min,
+            "rms": rms,
+            "count": count,
+            "nans": nans,
+        }
+
+        result = np.full((len(columns), len(_STATS)), np.nan)
+        for _ in _RANGE_STATS:
+            result[:, _STATS.index(_)] = stats[_]
+        data_frame = _frame(result, headers, Lang(lang))
+        return data_frame.iloc[:, [_STATS.index(_) for _ in _RANGE_STATS]]
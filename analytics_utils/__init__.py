@@ -4,9 +4,16 @@
 from .partial_autocorrelation import partial_autocorrelation
 from .autocorrelation import autocorrelation
 from .describe_data import describe_data
+from .DescribeSummary import DescribeSummary
+from .QuantileSketch import QuantileSketch
+from .PrefixMomentIndex import PrefixMomentIndex
+from .IncrementalDescriber import IncrementalDescriber
 from .interpolate import interpolate
 from .correlate import correlate
+from .CorrelationSummary import CorrelationSummary
+from .cross_correlate import cross_correlate
 from .roll import roll
+from .OnlineRoller import OnlineRoller
 from .ewm import ewm
 
 __version__ = "0.6.dev0"
@@ -14,9 +21,16 @@ __all__ = [
     "partial_autocorrelation",
     "autocorrelation",
     "describe_data",
+    "DescribeSummary",
+    "QuantileSketch",
+    "PrefixMomentIndex",
+    "IncrementalDescriber",
     "decomposers",
     "interpolate",
     "correlate",
+    "CorrelationSummary",
+    "cross_correlate",
     "roll",
+    "OnlineRoller",
     "ewm",
 ]
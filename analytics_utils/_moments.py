@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+This is the find module.
+The find module supplies the mergeable moments, the statistics, the
+chunking and the process pool shared by
+    describe_data, DescribeSummary, PrefixMomentIndex and correlate
+"""
+
+from analytics_utils.lang import Lang
+from multiprocessing import Pool
+from numpy.lib.format import open_memmap
+import pandas as pd
+import numpy as np
+import tempfile
+import os
+
+
+FIRST_QUARTILE = 0.25
+THIRD_QUARTILE = 0.75
+IQR_CONSTANT = 1.5
+
+# Statistics returned by describe_data, in output order
+_STATS = (
+    "max",
+    "min",
+    "mean",
+    "median",
+    "lower",
+    "q1",
+    "q3",
+    "upper",
+    "var",
+    "std",
+    "mad",
+    "amp",
+    "rms",
+    "kurtosis",
+    "skew",
+    "count",
+    "nans",
+)
+
+
+def _labels(lang: Lang) -> [str]:
+    """Localized column labels of the statistics, in output order"""
+    phrases = {
+        "lower": lambda: lang.phrase("limit", lang.word("lower")),
+        "q1": lambda: lang.phrase("quartile", "1"),
+        "q3": lambda: lang.phrase("quartile", "3"),
+        "upper": lambda: lang.phrase("limit", lang.word("upper")),
+    }
+    return [phrases[_]() if _ in phrases else lang.word(_) for _ in _STATS]
+
+
+def _zero_out_fperr(values: np.ndarray) -> np.ndarray:
+    """Same floating point error cleanup applied by pandas nanops"""
+    return np.where(np.abs(values) < 1e-14, 0, values)
+
+
+def _moments(values: np.ndarray, starts: np.ndarray = None) -> dict:
+    """Mergeable moments of each column of a 2-D block: count, NaN count,
+    min, max, mean and the sums of the central powers up to order 4. With
+    starts (first row of each segment of rows, sorted), the moments of each
+    segment, shaped (segments, columns)"""
+
+    def _reduce(ufunc, block, **kwargs):
+        if starts is None:
+            if ufunc in (np.fmin, np.fmax):
+                kwargs["initial"] = np.nan
+            return ufunc.reduce(block, axis=0, **kwargs)
+        return ufunc.reduceat(block, starts, axis=0, **kwargs)
+
+    def _product(a, b):
+        if starts is None:
+            return np.einsum("ij,ij->j", a, b)
+        return np.add.reduceat(a * b, starts, axis=0)
+
+    mask = np.isnan(values)
+    nans = _reduce(np.add, mask, dtype=np.int64)
+    if starts is None:
+        count = values.shape[0] - nans
+    else:
+        lengths = np.diff(np.append(starts, values.shape[0]))
+        count = lengths[:, None] - nans
+    with np.errstate(invalid="ignore", divide="ignore"):
+        filled = np.where(mask, 0.0, values)
+        mean = np.where(count > 0, _reduce(np.add, filled) / count, 0.0)
+
+        if starts is None:
+            dev = np.subtract(values, mean, out=filled)
+        else:
+            dev = np.subtract(
+                values, np.repeat(mean, lengths, axis=0), out=filled
+            )
+        dev[mask] = 0.0
+        dev2 = dev * dev
+        return {
+            "count": count,
+            "nans": nans,
+            "min": _reduce(np.fmin, values),
+            "max": _reduce(np.fmax, values),
+            "mean": mean,
+            "m2": _reduce(np.add, dev2),
+            "m3": _product(dev2, dev),
+            "m4": _product(dev2, dev2),
+            # Not mergeable, only used when the block is the whole data
+            "mad": _reduce(np.add, np.abs(dev)),
+        }
+
+
+def _merge_moments(a: dict, b: dict) -> dict:
+    """Chan/Pébay merge of the moments of two disjoint sets of rows"""
+    na, nb = a["count"].astype(np.float64), b["count"].astype(np.float64)
+    n = na + nb
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta = np.where(n > 0, b["mean"] - a["mean"], 0.0)
+        n = np.where(n > 0, n, 1.0)
+        mean = a["mean"] + delta * nb / n
+        m2 = a["m2"] + b["m2"] + delta ** 2 * na * nb / n
+        m3 = (
+            a["m3"]
+            + b["m3"]
+            + delta ** 3 * na * nb * (na - nb) / n ** 2
+            + 3 * delta * (na * b["m2"] - nb * a["m2"]) / n
+        )
+        m4 = (
+            a["m4"]
+            + b["m4"]
+            + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+            + 6 * delta ** 2 * (na ** 2 * b["m2"] + nb ** 2 * a["m2"]) / n ** 2
+            + 4 * delta * (na * b["m3"] - nb * a["m3"]) / n
+        )
+    return {
+        "count": a["count"] + b["count"],
+        "nans": a["nans"] + b["nans"],
+        "min": np.fmin(a["min"], b["min"]),
+        "max": np.fmax(a["max"], b["max"]),
+        "mean": mean,
+        "m2": m2,
+        "m3": m3,
+        "m4": m4,
+    }
+
+
+def _stats(moments: dict, q1, median, q3, mad) -> np.ndarray:
+    """Finalizes the moments and the order statistics into the matrix of
+    shape (columns, len(_STATS))"""
+    count, m2, m3, m4 = (
+        moments["count"],
+        moments["m2"],
+        moments["m3"],
+        moments["m4"],
+    )
+    valid = count > 0
+    _min = np.where(valid, moments["min"], np.nan)
+    _max = np.where(valid, moments["max"], np.nan)
+    _mean = np.where(valid, moments["mean"], np.nan)
+
+    # Scatter
+    _iqr = q3 - q1
+    _lower = np.fmax(_min, q1 - (IQR_CONSTANT * _iqr))
+    _upper = np.fmin(_max, q3 + (IQR_CONSTANT * _iqr))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        _var = np.where(count > 1, m2 / (count - 1), np.nan)
+        _rms = np.sqrt(_mean ** 2 + m2 / count)
+
+        m2 = _zero_out_fperr(m2)
+        m3 = _zero_out_fperr(m3)
+        _skew = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+        _skew = np.where(m2 == 0, 0, _skew)
+        _skew[count < 3] = np.nan
+
+        adj = 3 * (count - 1) ** 2 / ((count - 2) * (count - 3))
+        numer = _zero_out_fperr(count * (count + 1) * (count - 1) * m4)
+        denom = _zero_out_fperr((count - 2) * (count - 3) * m2 ** 2)
+        _kurt = np.where(denom == 0, 0, numer / denom - adj)
+        _kurt[count < 4] = np.nan
+
+    stats = {
+        "max": _max,
+        "min": _min,
+        "mean": _mean,
+        "median": median,
+        "lower": _lower,
+        "q1": q1,
+        "q3": q3,
+        "upper": _upper,
+        "var": _var,
+        "std": np.sqrt(_var),
+        "mad": mad,
+        "amp": _max - _min,
+        "rms": _rms,
+        "kurtosis": _kurt,
+        "skew": _skew,
+        "count": count,
+        "nans": moments["nans"],
+    }
+    result = np.empty((len(count), len(_STATS)))
+    for i, _ in enumerate(_STATS):
+        result[:, i] = stats[_]
+    return result
+
+
+def _index(headers: [str], groups: pd.Index = None, name: str = None):
+    """Row index of a block of statistics: the headers, or the (group,
+    header) pairs when the groups are given"""
+    index = pd.Index(headers, name=name)
+    if groups is None:
+        return index
+    return pd.MultiIndex.from_arrays(
+        [
+            groups.get_level_values(_).repeat(len(index))
+            for _ in range(groups.nlevels)
+        ]
+        + [np.tile(index, len(groups))],
+        names=list(groups.names) + [name],
+    )
+
+
+def _frame(
+    result: np.ndarray, headers: [str], lang: Lang, groups: pd.Index = None
+) -> pd.DataFrame:
+    """Attaches the localized labels to a block of statistics, indexed by
+    (group, header) when the groups are given"""
+    labels = _labels(lang)
+    index = _index(headers, groups, lang.word("header"))
+    data_frame = pd.DataFrame(
+        result.reshape(-1, len(_STATS)), index=index, columns=labels
+    )
+    return data_frame.astype(
+        {labels[_STATS.index("count")]: int, labels[_STATS.index("nans")]: int}
+    )
+
+
+def _chunks(data_frame: pd.DataFrame, chunksize: int):
+    """Yields the dataframe in chunks of rows"""
+    for start in range(0, len(data_frame), chunksize):
+        stop = start + chunksize
+        yield data_frame.iloc[start:stop]
+
+
+def _shared_map(function, columns, shape: tuple, tasks: list, n_jobs: int):
+    """Yields, in order, function((path,) + task) of each task, mapped on a
+    pool of n_jobs processes. The columns are written once to a
+    column-major memory-mapped .npy of the given shape (in /dev/shm when
+    available, so it stays in shared memory) at path, and every worker maps
+    them from it instead of receiving a pickled copy"""
+    shm = "/dev/shm"
+    descriptor, path = tempfile.mkstemp(
+        suffix=".npy", dir=shm if os.path.isdir(shm) else None
+    )
+    os.close(descriptor)
+    try:
+        block = open_memmap(
+            path, mode="w+", dtype=np.float64, shape=shape, fortran_order=True
+        )
+        for i, column in enumerate(columns):
+            block[:, i] = column
+        block.flush()
+        del block
+
+        with Pool(n_jobs) as pool:
+            for result in pool.imap(function, [(path,) + _ for _ in tasks]):
+                yield result
+    finally:
+        os.remove(path)
@@ -5,34 +5,612 @@ The find module supplies one function,
     correlate()
 """
 
+from analytics_utils.CorrelationSummary import CorrelationSummary
+from analytics_utils._moments import _chunks, _shared_map
+from numba import njit
+from numpy.lib.format import open_memmap
 import pandas as pd
+import numpy as np
+import os
+
+
+# Columns per tile of the blocked engine, by default
+_BLOCK_SIZE = 1024
+
+# Methods of the blocked engine, the pandas ones otherwise
+_METHODS = ("pearson", "spearman", "kendall")
+
+
+def _standardize(
+    data_frame: pd.DataFrame, block_size: int, dtype: type
+) -> (np.ndarray, np.ndarray):
+    """Columns centered on their mean, with zeros at the NaNs, and scaled to
+    unit norm when complete, built a block of columns at a time, and the
+    mask of the non-NaN values (None without NaNs)"""
+    n_rows, n_columns = data_frame.shape
+    z = np.empty((n_rows, n_columns), dtype)
+    mask = None
+    for start in range(0, n_columns, block_size):
+        columns = slice(start, start + block_size)
+        values = data_frame.iloc[:, columns].to_numpy(dtype=np.float64)
+        observed = ~np.isnan(values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            count = observed.sum(axis=0)
+            mean = np.where(observed, values, 0).sum(axis=0) / count
+            values = np.where(observed, values - mean, 0)
+            # The correlation of complete columns is their dot product
+            complete = observed.all(axis=0)
+            norm = np.sqrt((values * values).sum(axis=0))
+            values[:, complete] /= norm[complete]
+        z[:, columns] = values
+        if not observed.all():
+            if mask is None:
+                mask = np.ones((n_rows, n_columns), bool)
+            mask[:, columns] = observed
+    return z, mask
+
+
+def _correlate_tile(
+    z: np.ndarray,
+    mask: np.ndarray,
+    rows: slice,
+    columns: slice,
+    min_periods: int,
+) -> (np.ndarray, np.ndarray):
+    """Pearson correlation of the columns in rows with the ones in columns,
+    over the rows where both are non-NaN, and the numbers of these rows"""
+    x, y = z[:, rows], z[:, columns]
+    n = len(z)
+    if mask is None or (mask[:, rows].all() and mask[:, columns].all()):
+        tile = x.T @ y
+    else:
+        # Sums over the rows where both are non-NaN, from matrix products
+        mask_x = mask[:, rows].astype(z.dtype)
+        mask_y = mask[:, columns].astype(z.dtype)
+        n = mask_x.T @ mask_y
+        sum_x, sum_y = x.T @ mask_y, mask_x.T @ y
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = x.T @ y - sum_x * sum_y / n
+            var_x = (x * x).T @ mask_y - sum_x * sum_x / n
+            var_y = mask_x.T @ (y * y) - sum_y * sum_y / n
+            tile = cov / np.sqrt(var_x * var_y)
+    return np.where(n >= max(min_periods, 1), tile, np.nan), n
+
+
+@njit(cache=True)
+def _common_ranks(values, order, other, rows, ranks):
+    """Average ranks (as pandas.rank) of values over the rows where other is
+    non-NaN too, walking the sort order of values (NaNs last) in O(n), into
+    ranks. Returns the number of these rows, listed into rows"""
+    m = 0
+    for row in order:
+        if np.isnan(values[row]):
+            break
+        if not np.isnan(other[row]):
+            rows[m] = row
+            m += 1
+    start = 0
+    while start < m:
+        stop = start + 1
+        value = values[rows[start]]
+        while stop < m and values[rows[stop]] == value:
+            stop += 1
+        for i in range(start, stop):
+            ranks[rows[i]] = (start + stop + 1) / 2
+        start = stop
+    return m
+
+
+@njit(cache=True)
+def _spearman_pairs(x, y, tile, fix):
+    """Spearman correlation of the pairs (i, j) of fix, of the columns x[i]
+    and y[j] ranked again over the rows where both are non-NaN, into tile,
+    as pandas does when their NaNs differ"""
+    n = x.shape[1]
+    orders_y = np.empty((y.shape[0], n), np.int64)
+    for j in range(y.shape[0]):
+        if fix[:, j].any():
+            orders_y[j] = np.argsort(y[j], kind="mergesort")
+    rows = np.empty(n, np.int64)
+    rank_x = np.empty(n)
+    rank_y = np.empty(n)
+    for i in range(x.shape[0]):
+        if not fix[i].any():
+            continue
+        order_x = np.argsort(x[i], kind="mergesort")
+        for j in range(y.shape[0]):
+            if not fix[i, j]:
+                continue
+            m = _common_ranks(y[j], orders_y[j], x[i], rows, rank_y)
+            _common_ranks(x[i], order_x, y[j], rows, rank_x)
+            center = (m + 1) / 2
+            sxy = sxx = syy = 0.0
+            for row in rows[:m]:
+                dx = rank_x[row] - center
+                dy = rank_y[row] - center
+                sxy += dx * dy
+                sxx += dx * dx
+                syy += dy * dy
+            divisor = np.sqrt(sxx * syy)
+            tile[i, j] = sxy / divisor if divisor else np.nan
+
+
+@njit(cache=True)
+def _kendall(x, order, y, min_periods, xs, ys, buffer):
+    """Kendall tau-b of x and y over the rows where both are non-NaN, in
+    O(n log n) (Knight's algorithm): the rows are walked in the sort order
+    of x (NaNs last), y sorted within the ties of x, and the discordant
+    pairs counted as the swaps of a merge sort of y. xs, ys and buffer are
+    scratch arrays of the size of x"""
+    m = 0
+    for row in order:
+        if np.isnan(x[row]):
+            break
+        if not np.isnan(y[row]):
+            xs[m] = x[row]
+            ys[m] = y[row]
+            m += 1
+    if m < max(min_periods, 1):
+        return np.nan
+
+    # Tied pairs of x and of (x, y), y sorted within the ties of x
+    x_ties = xy_ties = 0
+    start = 0
+    while start < m:
+        stop = start + 1
+        while stop < m and xs[stop] == xs[start]:
+            stop += 1
+        if stop - start > 1:
+            x_ties += (stop - start) * (stop - start - 1) // 2
+            ys[start:stop] = np.sort(ys[start:stop])
+            run = 1
+            for i in range(start + 1, stop + 1):
+                if i < stop and ys[i] == ys[i - 1]:
+                    run += 1
+                else:
+                    xy_ties += run * (run - 1) // 2
+                    run = 1
+        start = stop
+
+    # Swaps of a bottom-up merge sort of y, from insertion sorted runs
+    swaps = 0
+    width = 16
+    for start in range(0, m, width):
+        for i in range(start + 1, min(start + width, m)):
+            value = ys[i]
+            j = i
+            while j > start and ys[j - 1] > value:
+                ys[j] = ys[j - 1]
+                j -= 1
+            swaps += i - j
+            ys[j] = value
+    source, target = ys, buffer
+    while width < m:
+        for start in range(0, m, 2 * width):
+            middle = min(start + width, m)
+            stop = min(start + 2 * width, m)
+            i, j, k = start, middle, start
+            while i < middle and j < stop:
+                if source[j] < source[i]:
+                    swaps += middle - i
+                    target[k] = source[j]
+                    j += 1
+                else:
+                    target[k] = source[i]
+                    i += 1
+                k += 1
+            target[k:stop] = (
+                source[i:middle] if i < middle else source[j:stop]
+            )
+        source, target = target, source
+        width *= 2
+    ys = source
+
+    # Tied pairs of y, now sorted
+    y_ties = 0
+    run = 1
+    for i in range(1, m + 1):
+        if i < m and ys[i] == ys[i - 1]:
+            run += 1
+        else:
+            y_ties += run * (run - 1) // 2
+            run = 1
+
+    total = m * (m - 1) // 2
+    if total == x_ties or total == y_ties:
+        return np.nan
+    difference = total - x_ties - y_ties + xy_ties - 2 * swaps
+    return difference / np.sqrt(total - x_ties) / np.sqrt(total - y_ties)
+
+
+@njit(cache=True)
+def _kendall_tile(x, y, min_periods, diagonal):
+    """Kendall tau-b of the columns x[i] by the columns y[j]. In a diagonal
+    tile, the lower triangle mirrors the upper one and a column has 1 with
+    itself, as pandas"""
+    n = x.shape[1]
+    tile = np.empty((x.shape[0], y.shape[0]))
+    xs = np.empty(n)
+    ys = np.empty(n)
+    buffer = np.empty(n)
+    for i in range(x.shape[0]):
+        order = np.argsort(x[i], kind="mergesort")
+        for j in range(i if diagonal else 0, y.shape[0]):
+            if diagonal and i == j:
+                count = n - np.isnan(x[i]).sum()
+                tile[i, j] = 1.0 if count >= max(min_periods, 1) else np.nan
+            else:
+                tile[i, j] = _kendall(
+                    x[i], order, y[j], min_periods, xs, ys, buffer
+                )
+                if diagonal:
+                    tile[j, i] = tile[i, j]
+    return tile
+
+
+def _kendall_task(task: tuple) -> np.ndarray:
+    """Worker of _kendall_tiles: a tile of the memory-mapped ranks"""
+    path, rows, columns, min_periods = task
+    ranks = np.load(path, mmap_mode="r").T
+    return _kendall_tile(
+        ranks[rows], ranks[columns], min_periods, rows == columns
+    )
+
+
+def _kendall_tiles(
+    data_frame: pd.DataFrame,
+    min_periods: int,
+    block_size: int,
+    dtype: type,
+    n_jobs: int,
+):
+    """Tiles (rows, columns, tile) of the upper triangle of the Kendall tau-b
+    matrix. The columns are ranked once (dense ranks), and the tiles are
+    split across a pool of n_jobs processes mapping the ranks from the block
+    shared by _shared_map"""
+    n_columns = data_frame.shape[1]
+    if n_jobs > 1:
+        # A few tiles per process to balance the load
+        block_size = max(min(block_size, n_columns // (4 * n_jobs)), 1)
+    tasks = [
+        (
+            slice(start, min(start + block_size, n_columns)),
+            slice(other, min(other + block_size, n_columns)),
+        )
+        for start in range(0, n_columns, block_size)
+        for other in range(start, n_columns, block_size)
+    ]
+    if n_jobs <= 1:
+        ranks = np.ascontiguousarray(
+            data_frame.rank(method="dense").to_numpy(dtype=np.float64).T
+        )
+        for rows, columns in tasks:
+            tile = _kendall_tile(
+                ranks[rows], ranks[columns], min_periods, rows == columns
+            )
+            yield rows, columns, tile.astype(dtype, copy=False)
+        return
+
+    # Each column is ranked and written to the shared block in turn
+    tiles = _shared_map(
+        _kendall_task,
+        (
+            data_frame[_].rank(method="dense").to_numpy(dtype=np.float64)
+            for _ in data_frame
+        ),
+        data_frame.shape,
+        [_ + (min_periods,) for _ in tasks],
+        n_jobs,
+    )
+    for (rows, columns), tile in zip(tasks, tiles):
+        yield rows, columns, tile.astype(dtype, copy=False)
+
+
+def _correlate_tiles(
+    data_frame: pd.DataFrame,
+    min_periods: int,
+    block_size: int,
+    dtype: type,
+    method: str = "pearson",
+):
+    """Tiles (rows, columns, tile) of the upper triangle of the Pearson
+    correlation matrix, computed one at a time. For Spearman, of the ranks of
+    the columns, ranked once, the pairs whose NaNs differ being ranked again
+    over their common rows"""
+    n_columns = data_frame.shape[1]
+    ranked = data_frame.rank() if method == "spearman" else data_frame
+    z, mask = _standardize(ranked, block_size, dtype)
+    if method == "spearman" and mask is not None:
+        count = mask.sum(axis=0)
+    for start in range(0, n_columns, block_size):
+        rows = slice(start, min(start + block_size, n_columns))
+        for other in range(start, n_columns, block_size):
+            columns = slice(other, min(other + block_size, n_columns))
+            tile, n = _correlate_tile(z, mask, rows, columns, min_periods)
+            if method == "spearman" and np.ndim(n):
+                fix = (n >= max(min_periods, 1)) & (
+                    (n < count[rows, None]) | (n < count[None, columns])
+                )
+                if other == start:
+                    # Symmetric, the lower triangle is mirrored below
+                    fix = np.triu(fix, 1)
+                if fix.any():
+                    values = data_frame.iloc[:, rows].to_numpy(np.float64)
+                    others = data_frame.iloc[:, columns].to_numpy(np.float64)
+                    tile = tile.astype(np.float64)
+                    _spearman_pairs(
+                        np.ascontiguousarray(values.T),
+                        np.ascontiguousarray(others.T),
+                        tile,
+                        fix,
+                    )
+                    if other == start:
+                        upper = np.triu_indices_from(tile, 1)
+                        tile.T[upper] = tile[upper]
+                    tile = tile.astype(dtype, copy=False)
+            if other == start:
+                # A column is fully correlated with itself
+                diagonal = tile.diagonal()
+                np.fill_diagonal(tile, np.where(np.isnan(diagonal), np.nan, 1))
+            yield rows, columns, tile
+
+
+def _correlate_blocks(
+    tiles, n_columns: int, dtype: type, out: str = None
+) -> np.ndarray:
+    """Correlation matrix of the tiles, in memory or in the memory-mapped
+    .npy file out"""
+    matrix = (
+        np.empty((n_columns, n_columns), dtype)
+        if out is None
+        else open_memmap(out, "w+", dtype, (n_columns, n_columns))
+    )
+    for rows, columns, tile in tiles:
+        matrix[rows, columns] = tile
+        matrix[columns, rows] = tile.T
+        if out is not None and columns.stop == n_columns:
+            matrix.flush()
+    return matrix
+
+
+@njit(cache=True)
+def _merge_top(magnitude, partner, value, first, other, tile, floor):
+    """Merges the pairs of a tile, of the columns from first by the ones from
+    other, into the top partners of the columns (sorted by magnitude, from
+    the strongest one), keeping the ones above floor"""
+    top_k = magnitude.shape[1]
+    for r in range(tile.shape[0]):
+        a = first + r
+        # Magnitude to exceed, the one of the last partner once full
+        bound = max(floor, magnitude[a, top_k - 1])
+        for c in range(tile.shape[1]):
+            m = abs(tile[r, c])
+            if not m > bound or other + c == a:
+                continue
+            h = top_k - 1
+            while h and magnitude[a, h - 1] < m:
+                magnitude[a, h] = magnitude[a, h - 1]
+                partner[a, h] = partner[a, h - 1]
+                value[a, h] = value[a, h - 1]
+                h -= 1
+            magnitude[a, h] = m
+            partner[a, h] = other + c
+            value[a, h] = tile[r, c]
+            bound = max(floor, magnitude[a, top_k - 1])
+
+
+def _correlate_pairs(
+    tiles, n_columns: int, dtype: type, top_k: int, threshold: float
+) -> (np.ndarray, np.ndarray, np.ndarray):
+    """Positions (a, b) and values of the kept pairs of the tiles, b != a
+    and |value| > threshold: the top_k partners b of each column a, from the
+    strongest one, or without top_k the pairs a < b. Only the kept pairs are
+    held, never the matrix"""
+    floor = -1.0 if threshold is None else threshold
+    if top_k:
+        magnitude = np.full((n_columns, top_k), -np.inf)
+        partner = np.full((n_columns, top_k), -1, np.int64)
+        value = np.zeros((n_columns, top_k), dtype)
+    found = []
+    for rows, columns, tile in tiles:
+        if top_k:
+            first, other = rows.start, columns.start
+            _merge_top(magnitude, partner, value, first, other, tile, floor)
+            if other != first:
+                _merge_top(
+                    magnitude, partner, value, other, first, tile.T, floor
+                )
+            continue
+        a = np.arange(rows.start, rows.stop)
+        b = np.arange(columns.start, columns.stop)
+        with np.errstate(invalid="ignore"):
+            keep = (np.abs(tile) > floor) & (a[:, None] < b)
+        i, j = np.nonzero(keep)
+        found.append((a[i], b[j], tile[i, j]))
+
+    if top_k:
+        kept = magnitude > -np.inf
+        a = np.broadcast_to(np.arange(n_columns)[:, None], kept.shape)
+        return a[kept], partner[kept], value[kept]
+    if not found:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    a, b, r = (np.concatenate(_) for _ in zip(*found))
+    order = np.lexsort((b, a))
+    return a[order], b[order], r[order]
+
+
+def _correlate_chunks(chunks, headers: [str] = None):
+    """Streams chunks of rows through a CorrelationSummary: the co-moments of
+    the pairs of headers are merged exactly. Only one chunk is held in memory
+    at a time.
+
+    Parameters
+    ----------
+    chunks : iterable of pd.DataFrame
+        Chunks of rows with the same columns
+    headers : [str], optional
+        Chosen headers, by default the numeric and boolean columns of the
+        first chunk
+
+    Returns
+    -------
+    CorrelationSummary
+        Summary of all the chunks
+    """
+    summary = None
+    for chunk in chunks:
+        if summary is None:
+            summary = CorrelationSummary(chunk, headers)
+        else:
+            summary.update(chunk)
+
+    if summary is None:
+        raise ValueError("no chunks to correlate")
+    return summary
 
 
 def correlate(
-    data_frame: pd.DataFrame, method: str = "pearson", min_periods: int = 1
+    data_frame: pd.DataFrame,
+    method: str = "pearson",
+    min_periods: int = 1,
+    block_size: int = None,
+    dtype: type = np.float64,
+    out: str = None,
+    top_k: int = None,
+    threshold: float = None,
+    n_jobs: int = None,
+    chunksize: int = None,
 ) -> pd.DataFrame:
     """This function returns the correlation between the columns of a
     dataframe. This is the same corr function in pandas package.
 
+    For very wide frames, the blocked engine standardizes the columns once
+    and computes the matrix tile by tile (block_size columns by block_size
+    columns) with BLAS matrix products, over the rows where both columns are
+    non-NaN. In float32 it takes half the memory and time. With out, the
+    tiles are written to a memory-mapped .npy file, so the memory of the
+    matrix is bounded by a tile.
+
+    The rank methods always use the blocked engine, ranking each column
+    once. Spearman is the Pearson correlation of the ranks (the pairs whose
+    NaNs differ are ranked again over their common rows, as pandas). Kendall
+    tau-b counts the discordant pairs of each pair of columns with a merge
+    sort, in O(n log n) rather than O(n²), on n_jobs processes.
+
+    In chunked mode (data_frame given as an iterable of dataframes, as
+    returned by pd.read_csv with chunksize, or chunksize given) the chunks are
+    streamed through a CorrelationSummary (pearson only), and the peak memory
+    is bounded by the chunk size plus a few matrices. Summaries of shards
+    computed elsewhere can be merged with CorrelationSummary.merge.
+
+    With top_k or threshold only the strongest pairs are kept, as they are
+    computed: the dense matrix is never held and the memory scales with the
+    kept pairs, returned in long format.
+
     Parameters
     ----------
     data_frame : pd.DataFrame
-        Input dataframe
+        Input dataframe, or an iterable of dataframes (chunked mode)
     method : str, optional
-        See pandas.DataFrame.corr, by default "pearson"
+        {"pearson", "spearman", "kendall"} or a callable, see
+        pandas.DataFrame.corr, by default "pearson"
     min_periods : int, optional
         See pandas.DataFrame.corr, by default 1
+    block_size : int, optional
+        Columns per tile of the blocked engine, by default None
+        (pandas.DataFrame.corr for pearson), or 1024
+    dtype : type, optional
+        Type of the blocked engine, by default np.float64
+    out : str, optional
+        Path of the .npy file of the matrix of the blocked engine, by
+        default None (in memory)
+    top_k : int, optional
+        Keeps the top_k partners of each column of largest absolute
+        correlation, by default None
+    threshold : float, optional
+        Keeps the pairs of absolute correlation above threshold, by default
+        None. Alone, each pair is kept once
+    n_jobs : int, optional
+        Number of processes of kendall, -1 for all the CPUs, by default None
+        (1)
+    chunksize : int, optional
+        Rows per chunk, streams the dataframe in chunked mode, by default
+        None
 
     Returns
     -------
     pd.DataFrame
-        Correlation matrix
+        Correlation matrix, backed by the .npy file with out. With top_k or
+        threshold, a dataframe of (col_a, col_b, r) columns, a row per kept
+        pair, by col_a (and from the strongest partner with top_k)
+
+    Raises
+    ------
+    ValueError
+        Blocked engine with a callable method, chunked mode with a method
+        other than pearson, block_size or top_k lower than 1, or out with
+        top_k or threshold
     """
-    return data_frame.corr(method, min_periods)
+    pairs = top_k is not None or threshold is not None
+    if isinstance(data_frame, pd.DataFrame) and chunksize:
+        data_frame = _chunks(data_frame, chunksize)
+    chunked = not isinstance(data_frame, pd.DataFrame)
+    if (
+        not chunked
+        and method not in _METHODS[1:]
+        and block_size is None
+        and out is None
+        and np.dtype(dtype) == np.float64
+        and not pairs
+    ):
+        return data_frame.corr(method, min_periods)
+    if chunked and method != "pearson":
+        raise ValueError("chunked mode only supports pearson")
+    if method not in _METHODS:
+        raise ValueError(
+            "the blocked engine only supports {}".format(", ".join(_METHODS))
+        )
+    if block_size is not None and block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    if top_k is not None and top_k < 1:
+        raise ValueError("top_k must be at least 1")
+    if pairs and out is not None:
+        raise ValueError("out is only for the whole matrix")
+
+    if chunked:
+        summary = _correlate_chunks(data_frame)
+        headers = pd.Index(summary.headers)
+        n_columns = len(headers)
+        everything = slice(0, n_columns)
+        matrix = summary.finalize(min_periods).to_numpy(dtype=dtype)
+        tiles = [(everything, everything, matrix)]
+    else:
+        data_frame = data_frame.select_dtypes(include=["number", "bool"])
+        headers, n_columns = data_frame.columns, data_frame.shape[1]
+        block_size = block_size or _BLOCK_SIZE
+        if method == "kendall":
+            if n_jobs == -1:
+                n_jobs = os.cpu_count()
+            tiles = _kendall_tiles(
+                data_frame, min_periods, block_size, dtype, n_jobs or 1
+            )
+        else:
+            tiles = _correlate_tiles(
+                data_frame, min_periods, block_size, dtype, method
+            )
+    if pairs:
+        a, b, r = _correlate_pairs(tiles, n_columns, dtype, top_k, threshold)
+        columns = np.asarray(headers)
+        return pd.DataFrame(
+            {"col_a": columns[a], "col_b": columns[b], "r": r}
+        )
+    matrix = _correlate_blocks(tiles, n_columns, dtype, out)
+    return pd.DataFrame(matrix, index=headers, columns=headers, copy=False)
 
 
 if __name__ == "__main__":
     import argparse
+    import sys
 
     # construct the argument parser and parse the arguments
     ap = argparse.ArgumentParser()
@@ -53,12 +631,67 @@ if __name__ == "__main__":
     )
     ap.add_argument("--method", type=str, default="pearson")
     ap.add_argument("--min-periods", type=int, default=1)
+    ap.add_argument(
+        "--block-size",
+        type=int,
+        help="""Columns per tile of the blocked engine, for wide datasets
+        (default: None).""",
+    )
+    ap.add_argument(
+        "--float32",
+        action="store_true",
+        help="Blocked engine in float32 (default: False).",
+    )
+    ap.add_argument(
+        "--npy",
+        type=str,
+        help="""Path of a .npy file where the matrix is written tile by tile,
+        instead of the json output (default: None).""",
+    )
+    ap.add_argument(
+        "-k",
+        "--top-k",
+        type=int,
+        help="""Keeps the top k partners of each column, in (col_a, col_b, r)
+        rows (default: None).""",
+    )
+    ap.add_argument(
+        "-th",
+        "--threshold",
+        type=float,
+        help="""Keeps the pairs of absolute correlation above threshold, in
+        (col_a, col_b, r) rows (default: None).""",
+    )
+    ap.add_argument(
+        "-c",
+        "--chunksize",
+        type=int,
+        help="""Rows per chunk read from the dataset, streams it through a
+        CorrelationSummary, pearson only (default: None).""",
+    )
+    ap.add_argument(
+        "-j",
+        "--n-jobs",
+        type=int,
+        help="""Number of processes of kendall, -1 for all the CPUs
+        (default: None).""",
+    )
     args = vars(ap.parse_args())
 
     # Apply
     result = correlate(
-        pd.read_csv(args["dataset"]), args["method"], args["min_periods"]
+        pd.read_csv(args["dataset"], chunksize=args["chunksize"]),
+        args["method"],
+        args["min_periods"],
+        block_size=args["block_size"],
+        dtype=np.float32 if args["float32"] else np.float64,
+        out=args["npy"],
+        top_k=args["top_k"],
+        threshold=args["threshold"],
+        n_jobs=args["n_jobs"],
     )
+    if args["npy"]:
+        sys.exit()
 
     # Output in json format
     result = result.to_json(
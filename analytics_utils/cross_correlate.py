@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+This is the find module.
+The find module supplies one function,
+    cross_correlate()
+"""
+
+import pandas as pd
+import numpy as np
+
+
+def _lagged_sums(
+    a: np.ndarray, b: np.ndarray, nfft: int, lags: np.ndarray
+) -> np.ndarray:
+    """Sums of a[t] * b[t + lag] of the column a by the columns of b, for
+    each lag, from their real FFTs (of length nfft, long enough to not wrap
+    around)"""
+    return np.fft.irfft(np.conj(a)[:, None] * b, nfft, axis=0)[lags % nfft].T
+
+
+def _overlap_sums(prefix: np.ndarray, lags: np.ndarray, leading: bool):
+    """Sums of the columns over the rows overlapping at each lag, from their
+    prefix sums: the rows t of a leading column, or t + lag of a lagging
+    one, with 0 <= t, t + lag < n. Shape (columns, lags)"""
+    n = len(prefix) - 1
+    if leading:
+        start, stop = np.maximum(-lags, 0), n - np.maximum(lags, 0)
+    else:
+        start, stop = np.maximum(lags, 0), n + np.minimum(lags, 0)
+    return (prefix[stop] - prefix[start]).T
+
+
+def cross_correlate(
+    data_frame: pd.DataFrame,
+    max_lag: int = 40,
+    headers: [str] = None,
+    min_periods: int = 1,
+) -> pd.DataFrame:
+    """This function returns the lead/lag relationship of each pair of
+    columns of a dataframe: the lag, between -max_lag and max_lag, of the
+    largest absolute Pearson correlation of col_a[t] with col_b[t + lag],
+    and this correlation.
+
+    The correlation at each lag is the one of correlate on shifted copies,
+    over the overlapping rows where both columns are non-NaN, but all the
+    lags of a pair come from one inverse FFT of the product of the FFTs of
+    the columns, computed once, in O(n log n) rather than O(n max_lag). The
+    sums over the overlaps come from prefix sums, or, with NaNs, from the
+    FFTs of the NaN masks.
+
+    Parameters
+    ----------
+    data_frame : pd.DataFrame
+        Input dataframe, its rows evenly spaced in time
+    max_lag : int, optional
+        Largest lag (in rows) in both directions, by default 40
+    headers : [str], optional
+        Chosen dataframe headers, by default the numeric and boolean columns
+    min_periods : int, optional
+        Minimum number of overlapping rows of a pair at a lag, by default 1
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe of (col_a, col_b, lag, r) columns, a row per pair of
+        headers (col_a before col_b). A positive lag means col_a leads col_b.
+        Among equal peaks, the smallest absolute lag is kept; r is NaN (and
+        lag 0) when no lag has a valid correlation
+
+    Raises
+    ------
+    ValueError
+        max_lag lower than 0
+    """
+    if max_lag < 0:
+        raise ValueError("max_lag must be at least 0")
+    if not headers:
+        headers = data_frame.select_dtypes(include=["number", "bool"]).columns
+    values = data_frame.loc[:, headers].to_numpy(dtype=np.float64)
+    n, k = values.shape
+    max_lag = min(max_lag, max(n - 1, 0))
+    # From the smallest absolute lag, which wins the ties of the peaks
+    lags = np.arange(-max_lag, max_lag + 1)
+    lags = lags[np.argsort(np.abs(lags), kind="mergesort")]
+
+    # Centered on the column means, to limit the cancellation of the sums
+    mask = ~np.isnan(values)
+    shift = np.where(mask, values, 0).sum(axis=0) / np.maximum(
+        mask.sum(axis=0), 1
+    )
+    x = np.where(mask, values - shift, 0)
+    # A power of two, at least n + max_lag so the lags do not wrap around
+    nfft = 1 << max(n + max_lag - 1, 0).bit_length()
+    fft_x = np.fft.rfft(x, nfft, axis=0)
+    if mask.all():
+        zeros = np.zeros((1, k))
+        prefix = np.concatenate((zeros, np.cumsum(x, axis=0)))
+        prefix2 = np.concatenate((zeros, np.cumsum(x * x, axis=0)))
+        sum_a = _overlap_sums(prefix, lags, True)
+        sum_b = _overlap_sums(prefix, lags, False)
+        sum_aa = _overlap_sums(prefix2, lags, True)
+        sum_bb = _overlap_sums(prefix2, lags, False)
+        count = (n - np.abs(lags)).astype(np.float64)
+    else:
+        fft_m = np.fft.rfft(mask.astype(np.float64), nfft, axis=0)
+        fft_x2 = np.fft.rfft(x * x, nfft, axis=0)
+
+    col_a, col_b = [np.empty(0, int)], [np.empty(0, int)]
+    peak_lag, peak_r = [np.empty(0, int)], [np.empty(0)]
+    for a in range(k - 1):
+        b = slice(a + 1, k)
+        sum_ab = _lagged_sums(fft_x[:, a], fft_x[:, b], nfft, lags)
+        if mask.all():
+            n_ab = count
+            x_a, x_b = sum_a[a], sum_b[b]
+            xx_a, xx_b = sum_aa[a], sum_bb[b]
+        else:
+            n_ab = _lagged_sums(fft_m[:, a], fft_m[:, b], nfft, lags).round()
+            x_a = _lagged_sums(fft_x[:, a], fft_m[:, b], nfft, lags)
+            x_b = _lagged_sums(fft_m[:, a], fft_x[:, b], nfft, lags)
+            xx_a = _lagged_sums(fft_x2[:, a], fft_m[:, b], nfft, lags)
+            xx_b = _lagged_sums(fft_m[:, a], fft_x2[:, b], nfft, lags)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sum_ab - x_a * x_b / n_ab
+            var_a = xx_a - x_a * x_a / n_ab
+            var_b = xx_b - x_b * x_b / n_ab
+            r = np.clip(cov / np.sqrt(var_a * var_b), -1, 1)
+            # Below the rounding of the FFTs, the variance is 0
+            flat = (var_a <= 1e-12 * xx_a) | (var_b <= 1e-12 * xx_b)
+        r[flat | (n_ab < max(min_periods, 1))] = np.nan
+
+        peak = np.argmax(np.where(np.isnan(r), -1, np.abs(r)), axis=1)
+        rows = np.arange(len(peak))
+        col_a.append(np.full(len(peak), a))
+        col_b.append(np.arange(a + 1, k))
+        peak_lag.append(lags[peak])
+        peak_r.append(r[rows, peak])
+
+    columns = np.asarray(headers)
+    peak_r = np.concatenate(peak_r)
+    return pd.DataFrame(
+        {
+            "col_a": columns[np.concatenate(col_a)],
+            "col_b": columns[np.concatenate(col_b)],
+            "lag": np.where(np.isnan(peak_r), 0, np.concatenate(peak_lag)),
+            "r": peak_r,
+        }
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # construct the argument parser and parse the arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "-d", "--dataset", required=True, help="path to input dataset"
+    )
+    ap.add_argument(
+        "-f", "--file-out", type=str, help="path to file of output json"
+    )
+    ap.add_argument(
+        "-o",
+        "--orient",
+        type=str,
+        default="columns",
+        help="""format json output
+        {'split', 'records', 'index', 'values', 'table', 'columns'}
+        (default: 'columns')""",
+    )
+    ap.add_argument(
+        "-pd",
+        "--parse-dates",
+        type=str,
+        nargs="*",
+        help="""Headers of columns to parse dates. A column named datetime is
+        created.""",
+    )
+    ap.add_argument(
+        "-i",
+        "--index",
+        type=str,
+        nargs="*",
+        help="Headers of columns to set as index.",
+    )
+    ap.add_argument(
+        "-hd",
+        "--headers",
+        type=str,
+        nargs="*",
+        help="an string for the header in the dataset",
+    )
+    ap.add_argument(
+        "-l",
+        "--max-lag",
+        type=int,
+        default=40,
+        help="Largest lag (in rows) in both directions (default: 40).",
+    )
+    ap.add_argument(
+        "-p",
+        "--min-periods",
+        type=int,
+        default=1,
+        help="""Minimum number of overlapping rows of a pair at a lag
+        (default: 1).""",
+    )
+    args = vars(ap.parse_args())
+
+    # If exist parse_dates, creates a structure with column name datetime
+    if args["parse_dates"]:
+        args["parse_dates"] = {"datetime": args["parse_dates"]}
+
+    # Apply
+    result = cross_correlate(
+        pd.read_csv(
+            args["dataset"],
+            parse_dates=args["parse_dates"],
+            index_col=args["index"],
+        ),
+        max_lag=args["max_lag"],
+        headers=args["headers"],
+        min_periods=args["min_periods"],
+    )
+
+    # Output in json format
+    result = result.to_json(
+        args.get("file_out"), force_ascii=False, orient=args["orient"]
+    )
+    if result:
+        print(result)
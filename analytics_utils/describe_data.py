@@ -5,23 +5,497 @@ The find module supplies one function,
     describe_data()
 """
 
+from analytics_utils.DescribeSummary import DescribeSummary
+from analytics_utils.QuantileSketch import QuantileSketch
+from analytics_utils._moments import (
+    FIRST_QUARTILE,
+    THIRD_QUARTILE,
+    _STATS,
+    _chunks,
+    _moments,
+    _shared_map,
+    _stats,
+    _index,
+    _frame,
+)
 from analytics_utils.lang import Lang
+from pandas.tseries.frequencies import to_offset
 import pandas as pd
+import numpy as np
+import os
 
 
-FIRST_QUARTILE = 0.25
-THIRD_QUARTILE = 0.75
-IQR_CONSTANT = 1.5
+QUANTILE_METHODS = ("exact", "sketch")
+
+# Rows fed at a time to the quantile sketches of an in-memory block
+_SKETCH_ROWS = 65536
+
+
+def _quantile(
+    ordered: np.ndarray, count: np.ndarray, q: float, starts: np.ndarray = 0
+) -> np.ndarray:
+    """Linear interpolated quantile of each column of a block already sorted
+    along the rows, with the NaNs at the end of each column (or at the end of
+    each segment of rows, with starts as the first row of each segment)"""
+    if not len(ordered):
+        return np.full(np.shape(count), np.nan)
+    position = q * np.maximum(count - 1, 0)
+    below = np.floor(position).astype(np.intp)
+    above = np.minimum(below + 1, np.maximum(count - 1, 0)) + starts
+    below = below + starts
+    columns = np.arange(ordered.shape[1])
+
+    low = ordered[below, columns]
+    high = ordered[above, columns]
+    frac = position - np.floor(position)
+    diff = high - low
+    with np.errstate(invalid="ignore"):
+        result = np.where(
+            frac >= 0.5, high - diff * (1 - frac), low + diff * frac
+        )
+    return np.where(count > 0, result, np.nan)
+
+
+def _sketch_quartiles(values: np.ndarray) -> (np.ndarray,) * 3:
+    """First quartile, median and third quartile of each column of a 2-D
+    block, estimated by streaming the rows through one QuantileSketch per
+    column"""
+    sketches = [QuantileSketch() for _ in range(values.shape[1])]
+    for start in range(0, values.shape[0], _SKETCH_ROWS):
+        stop = start + _SKETCH_ROWS
+        for sketch, column in zip(sketches, values[start:stop].T):
+            sketch.update(column)
+
+    quartiles = [FIRST_QUARTILE, 0.5, THIRD_QUARTILE]
+    return np.array([_.quantile(quartiles) for _ in sketches]).reshape(-1, 3).T
+
+
+def _describe_block(
+    values: np.ndarray, quantile_method: str = "exact"
+) -> np.ndarray:
+    """Computes all the statistics of describe_data for every column of a 2-D
+    block at once, with one moments pass and one sort pass (or one sketch
+    pass) for the order statistics.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Block of shape (rows, columns)
+    quantile_method : str, optional
+        {'exact', 'sketch'}, by default "exact"
+
+    Returns
+    -------
+    np.ndarray
+        Float64 matrix of shape (columns, len(_STATS))
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+
+    moments = _moments(values)
+    count = moments["count"]
+
+    if quantile_method == "sketch":
+        q1, median, q3 = _sketch_quartiles(values)
+    else:
+        # Order statistics: NaNs are sorted to the end of each column
+        ordered = np.sort(values, axis=0)
+        q1 = _quantile(ordered, count, FIRST_QUARTILE)
+        median = _quantile(ordered, count, 0.5)
+        q3 = _quantile(ordered, count, THIRD_QUARTILE)
+        del ordered
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mad = moments["mad"] / count
+    return _stats(moments, q1, median, q3, mad)
+
+
+def _describe_segments(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Computes all the statistics of describe_data for every segment of rows
+    and every column of a 2-D block at once, with segment reductions instead
+    of one call per segment.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Block of shape (rows, columns), with the rows sorted by segment
+    starts : np.ndarray
+        First row of each segment, sorted and without empty segments
+
+    Returns
+    -------
+    np.ndarray
+        Float64 array of shape (segments, columns, len(_STATS))
+    """
+    values = np.asarray(values, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.intp)
+    n_segments, n_cols = len(starts), values.shape[1]
+
+    moments = _moments(values, starts)
+    count = moments["count"]
+
+    # Order statistics: each column sorted within the segments, with the NaNs
+    # at the end of each segment
+    segment = np.repeat(
+        np.arange(n_segments), np.diff(np.append(starts, values.shape[0]))
+    )
+    ordered = np.empty_like(values)
+    for i in range(n_cols):
+        ordered[:, i] = values[np.lexsort((values[:, i], segment)), i]
+    q1 = _quantile(ordered, count, FIRST_QUARTILE, starts[:, None])
+    median = _quantile(ordered, count, 0.5, starts[:, None])
+    q3 = _quantile(ordered, count, THIRD_QUARTILE, starts[:, None])
+    del ordered
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mad = moments["mad"] / count
+    flat = {key: value.ravel() for key, value in moments.items()}
+    return _stats(
+        flat, q1.ravel(), median.ravel(), q3.ravel(), mad.ravel()
+    ).reshape(n_segments, n_cols, len(_STATS))
+
+
+def _describe_groups(
+    data_frame: pd.DataFrame, by: str or [str], headers: [str]
+) -> (np.ndarray, pd.Index):
+    """Describes every group of rows of the dataframe in one pass of segment
+    reductions. Rows with a missing key are dropped, as in pandas groupby
+
+    Returns
+    -------
+    (np.ndarray, pd.Index)
+        Float64 array of shape (groups, headers, len(_STATS)) and the sorted
+        group keys
+    """
+    grouped = data_frame.groupby(by, sort=True)
+    group = grouped.ngroup().to_numpy(dtype=np.float64)
+    keys = grouped.size().index
+
+    with np.errstate(invalid="ignore"):
+        rows = np.flatnonzero(group >= 0)
+    rows = rows[np.argsort(group[rows], kind="mergesort")]
+    group = group[rows]
+    starts = np.flatnonzero(np.append(True, group[1:] != group[:-1]))
+    if not rows.size:
+        starts = starts[:0]
+
+    values = data_frame.loc[:, headers].to_numpy(dtype=np.float64)[rows]
+    return _describe_segments(values, starts), keys
+
+
+def _buckets(
+    data_frame: pd.DataFrame, freq: str, headers: [str]
+) -> (pd.DatetimeIndex, np.ndarray, np.ndarray):
+    """Splits the rows of a dataframe with a DatetimeIndex in time buckets
+    of frequency freq. Fixed frequencies are floored from the epoch (as
+    resample with origin="epoch"); calendar offsets bucket the days between
+    their anchors as resample does, closed and labelled on the side given by
+    pd.Grouper (e.g. "MS" by the month start, "ME" by the month end, "W" from
+    Monday to Sunday, by the Sunday). Rows with a missing time are dropped
+
+    Returns
+    -------
+    (pd.DatetimeIndex, np.ndarray, np.ndarray)
+        Sorted labels of the buckets, first row of each bucket and the rows
+        of the headers sorted by bucket
+    """
+    if not isinstance(data_frame.index, pd.DatetimeIndex):
+        raise ValueError("freq needs a dataframe with a DatetimeIndex")
+    rows = np.flatnonzero(~data_frame.index.isna())
+    times = data_frame.index[rows]
+
+    offset = to_offset(freq)
+    try:
+        labels = times.floor(offset)
+    except ValueError:
+        # Calendar offset: each day is rolled to the anchor closing its
+        # bucket, then moved to the labelled side
+        grouper = pd.Grouper(freq=offset)
+        days = times.normalize()
+        unique = days.unique()
+        roll = offset.rollforward
+        if grouper.closed != "right":
+            roll = offset.rollback
+        anchors = pd.DatetimeIndex([roll(_) for _ in unique], tz=unique.tz)
+        if grouper.label != grouper.closed:
+            step = offset if grouper.closed == "left" else -offset
+            anchors = anchors + step
+        labels = anchors[unique.get_indexer(days)]
+
+    if not labels.is_monotonic_increasing:
+        order = np.argsort(labels.values.astype(np.int64), kind="mergesort")
+        rows, labels = rows[order], labels[order]
+    code = labels.values.astype(np.int64)
+    starts = np.flatnonzero(np.append(True, code[1:] != code[:-1]))
+    if not rows.size:
+        starts = starts[:0]
+
+    values = data_frame.loc[:, headers].to_numpy(dtype=np.float64)[rows]
+    return labels[starts], starts, values
+
+
+def _describe_bucket_chunks(
+    chunks, freq: str, headers: [str] = None
+) -> (np.ndarray, pd.DatetimeIndex, [str]):
+    """Describes the time buckets of chunks of rows sorted by time. The
+    buckets inside a chunk are described exactly with segment reductions.
+    The rows of the last bucket of a chunk are carried to the next chunk
+    while it may continue it, so the buckets spanning chunks are exact too,
+    and the memory is bounded by a chunk plus a bucket.
+
+    Returns
+    -------
+    (np.ndarray, pd.DatetimeIndex, [str])
+        Float64 array of shape (buckets, headers, len(_STATS)), the labels
+        of the buckets and the headers
+    """
+    results, keys, name = [], [], None
+    label, carry = None, []
+    for chunk in chunks:
+        if not headers:
+            headers = list(chunk.columns)
+        name = chunk.index.name
+        labels, starts, values = _buckets(chunk, freq, headers)
+        if not len(labels):
+            continue
+        if label is not None:
+            if labels[0] < label:
+                raise ValueError("chunks must be sorted by time to use freq")
+            if labels[0] == label:
+                if len(labels) == 1:
+                    carry.append(values)
+                    continue
+                starts = starts[1:]
+            else:
+                labels = labels.insert(0, label)
+            size = sum(len(_) for _ in carry)
+            starts = np.append(0, starts + size)
+            values = np.concatenate(carry + [values])
+
+        # The last bucket of the chunk stays open
+        stop = starts[-1]
+        if len(labels) > 1:
+            results.append(_describe_segments(values[:stop], starts[:-1]))
+            keys.extend(labels[:-1])
+        label, carry = labels[-1], [values[stop:]]
+
+    if label is not None:
+        results.append(
+            _describe_segments(np.concatenate(carry), np.zeros(1, np.intp))
+        )
+        keys.append(label)
+    if not results:
+        raise ValueError("no chunks to describe")
+    return (
+        np.concatenate(results),
+        pd.DatetimeIndex(keys, name=name),
+        headers,
+    )
+
+
+def _describe_columns(task: tuple) -> np.ndarray:
+    """Worker of _describe_parallel: describes a range of columns of the
+    memory-mapped block"""
+    path, start, stop, quantile_method = task
+    values = np.load(path, mmap_mode="r")
+    return _describe_block(values[:, start:stop], quantile_method)
+
+
+def _describe_parallel(
+    data_frame: pd.DataFrame,
+    headers: [str],
+    n_jobs: int,
+    quantile_method: str = "exact",
+) -> np.ndarray:
+    """Describes the headers split across a pool of n_jobs processes, every
+    worker mapping its columns from the block shared by _shared_map
+
+    Returns
+    -------
+    np.ndarray
+        Float64 matrix of shape (headers, len(_STATS)), in headers order
+    """
+    # A few tasks per process to balance the load
+    bounds = np.linspace(
+        0, len(headers), min(len(headers), 4 * n_jobs) + 1
+    ).astype(int)
+    parts = _shared_map(
+        _describe_columns,
+        (data_frame[_].to_numpy(dtype=np.float64) for _ in headers),
+        (len(data_frame), len(headers)),
+        [
+            (start, stop, quantile_method)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ],
+        n_jobs,
+    )
+    return np.concatenate(list(parts))
+
+
+def _describe_chunks(chunks, headers: [str] = None):
+    """Streams chunks of rows through a DescribeSummary: the moments are
+    merged exactly and the order statistics go through one QuantileSketch
+    per header. Only one chunk is held in memory at a time.
+
+    Parameters
+    ----------
+    chunks : iterable of pd.DataFrame
+        Chunks of rows with the same columns
+    headers : [str], optional
+        Chosen headers, by default the columns of the first chunk
+
+    Returns
+    -------
+    DescribeSummary
+        Summary of all the chunks
+    """
+    summary = None
+    for chunk in chunks:
+        if summary is None:
+            summary = DescribeSummary(chunk, headers)
+        else:
+            summary.update(chunk)
+
+    if summary is None:
+        raise ValueError("no chunks to describe")
+    return summary
+
+
+def _describe(
+    data_frame: pd.DataFrame,
+    headers: [str],
+    chunksize: int,
+    quantile_method: str,
+    by: str or [str],
+    freq: str,
+    n_jobs: int,
+) -> (np.ndarray, [str], pd.Index):
+    """Computes the statistics of describe_data, without labels
+
+    Returns
+    -------
+    (np.ndarray, [str], pd.Index)
+        Float64 array of shape (headers, len(_STATS)), or (groups, headers,
+        len(_STATS)) with by or freq, the headers and the groups (None
+        without by or freq)
+    """
+    if quantile_method not in (None,) + QUANTILE_METHODS:
+        raise ValueError(f"unsupported quantile_method {quantile_method}")
+
+    if freq is not None:
+        if by is not None:
+            raise ValueError("by and freq can not be used together")
+        if quantile_method == "sketch":
+            raise ValueError("freq only supports exact quantiles")
+        if isinstance(data_frame, pd.DataFrame) and chunksize:
+            data_frame = _chunks(data_frame, chunksize)
+        if not isinstance(data_frame, pd.DataFrame):
+            result, buckets, headers = _describe_bucket_chunks(
+                data_frame, freq, headers
+            )
+            return result, headers, buckets
+
+        if not headers:
+            headers = data_frame.columns
+        buckets, starts, values = _buckets(data_frame, freq, headers)
+        buckets.name = data_frame.index.name
+        result = _describe_segments(values, starts)
+        return result, headers, buckets
+
+    if by is not None:
+        if not isinstance(data_frame, pd.DataFrame) or chunksize:
+            raise ValueError("by is not available in chunked mode")
+        if quantile_method == "sketch":
+            raise ValueError("by only supports exact quantiles")
+        keys = [by] if isinstance(by, str) else list(by)
+        if not headers:
+            headers = [_ for _ in data_frame.columns if _ not in keys]
+        result, groups = _describe_groups(data_frame, by, headers)
+        return result, headers, groups
+
+    if isinstance(data_frame, pd.DataFrame) and chunksize:
+        data_frame = _chunks(data_frame, chunksize)
+    if not isinstance(data_frame, pd.DataFrame):
+        if quantile_method == "exact":
+            raise ValueError("chunked mode only supports sketch quantiles")
+        summary = _describe_chunks(data_frame, headers)
+        return summary.finalize(raw=True)[0], summary.headers, None
+
+    if not headers:
+        headers = data_frame.columns
+
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+    if n_jobs and n_jobs > 1 and len(headers) > 1:
+        result = _describe_parallel(
+            data_frame, headers, n_jobs, quantile_method or "exact"
+        )
+    else:
+        result = _describe_block(
+            data_frame.loc[:, headers].to_numpy(dtype=np.float64),
+            quantile_method or "exact",
+        )
+    return result, headers, None
 
 
 def describe_data(
-    data_frame: pd.DataFrame, lang: str = "pt", headers: [str] = None
-) -> pd.DataFrame:
+    data_frame: pd.DataFrame,
+    lang: str = "pt",
+    headers: [str] = None,
+    chunksize: int = None,
+    quantile_method: str = None,
+    by: str or [str] = None,
+    freq: str = None,
+    n_jobs: int = None,
+    raw: bool = False,
+) -> pd.DataFrame or (np.ndarray, pd.Index, tuple):
     """This function describe the datas of a dataframe. Returning the max,
     min, mean, median, quantile, variance, standard deviation,
     mean absolute deviation, amplitude, root mean squared, kurtosis, skewness
     and count for all headers in dataframe
 
+    All the headers are described together: the order statistics come from a
+    single sort of the selected block and the moments from a single pass
+    over it.
+
+    In chunked mode (data_frame given as an iterable of dataframes, as
+    returned by pd.read_csv with chunksize, or chunksize given) the chunks are
+    streamed through mergeable accumulators and the peak memory is bounded by
+    the chunk size. The max, min, mean, variance, standard deviation,
+    amplitude, rms, kurtosis, skewness, count and NaNs are exact (moments
+    merged with the Chan/Pébay formulas). The median, quartiles, limits and
+    mean absolute deviation are approximated with a QuantileSketch per header
+    (exact while a header holds no more than 1000 values).
+
+    The quantile_method "sketch" also estimates the median, quartiles and
+    limits of an in-memory dataframe with the sketches, in one streaming pass
+    of bounded memory instead of a sort of the whole block. The normalized
+    rank error of the estimates is about 0.3% with 99% confidence (see
+    QuantileSketch); the mean absolute deviation stays exact.
+
+    With by, every group of rows sharing the same key is described at once
+    with segment reductions over the rows sorted by key, and the result is
+    indexed by (group, header). Grouped descriptions use exact quantiles and
+    are not available in chunked mode.
+
+    With freq, the rows of a dataframe indexed by a DatetimeIndex are split
+    in time buckets (closed and labelled as resample does) and every bucket
+    is described at once, in a single pass over the rows sorted by time; the
+    result is indexed by (bucket, header). In chunked mode the chunks must be
+    sorted by time and the buckets are exact: the rows of a bucket spanning
+    chunks are carried to the next chunk, so the memory is bounded by a chunk
+    plus a bucket.
+
+    With n_jobs, the headers of an in-memory dataframe (without by or freq)
+    are split across a pool of processes that read their columns from a
+    shared memory-mapped copy of the block.
+
+    With raw, the statistics are returned as a float64 matrix, without
+    building the dataframe nor localizing the labels, together with the row
+    keys and the tuple of the statistics keys (in column order, e.g.
+    "mean", "q1", "nans").
+
     Parameters
     ----------
     data_frame : pd.DataFrame
@@ -30,53 +504,46 @@ def describe_data(
         Output language, by default "pt"
     headers : [str], optional
         Chosen dataframe headers, by default None
+    chunksize : int, optional
+        Number of rows per chunk of a dataframe described in chunked mode, by
+        default None
+    quantile_method : str, optional
+        {'exact', 'sketch'}, by default "exact" for a dataframe and "sketch"
+        in chunked mode (the only method available)
+    by : str or [str], optional
+        Key headers to group the rows by, by default None
+    freq : str, optional
+        Frequency of the time buckets (e.g. "1h", "D"), by default None
+    n_jobs : int, optional
+        Number of processes, -1 for all the CPUs, by default None (1)
+    raw : bool, optional
+        Return the unlabelled matrix instead of the dataframe, by default
+        False
 
     Returns
     -------
-    pd.DataFrame
-        Dataframe with the descriptions
-    """
+    pd.DataFrame or (np.ndarray, pd.Index, tuple)
+        Dataframe with the descriptions, or with raw the float64 matrix of
+        shape (rows, statistics), the row keys (headers, or (group, header)
+        pairs with by or freq) and the statistics keys
 
-    lang = Lang(lang)
-
-    def _apply(header: str, column: []):
-        _max = column.max()
-        _min = column.min()
-
-        # Scatter
-        _q1 = column.quantile(FIRST_QUARTILE)
-        _q3 = column.quantile(THIRD_QUARTILE)
-        _iqr = _q3 - _q1
-        _lower = max(_min, _q1 - (IQR_CONSTANT * _iqr))
-        _upper = min(_max, _q3 + (IQR_CONSTANT * _iqr))
-
-        return {
-            lang.word("header"): header,
-            lang.word("max"): _max,
-            lang.word("min"): _min,
-            lang.word("mean"): column.mean(),
-            lang.word("median"): column.median(),
-            lang.phrase("limit", lang.word("lower")): _lower,
-            lang.phrase("quartile", "1"): _q1,
-            lang.phrase("quartile", "3"): _q3,
-            lang.phrase("limit", lang.word("upper")): _upper,
-            lang.word("var"): column.var(),
-            lang.word("std"): column.std(),
-            lang.word("mad"): column.mad(),
-            lang.word("amp"): _max - _min,
-            lang.word("rms"): (column.pow(2)).mean() ** 0.5,
-            lang.word("kurtosis"): column.kurtosis(),
-            lang.word("skew"): column.skew(),
-            lang.word("count"): column.count(),
-            lang.word("nans"): column.isna().sum(),
-        }
-
-    if not headers:
-        headers = data_frame.columns
+    Raises
+    ------
+    ValueError
+        Unsupported quantile_method, "exact" in chunked mode, by with
+        chunked mode, by or freq with "sketch", or both by and freq
+    """
 
-    return pd.DataFrame(
-        [_apply(_, data_frame.loc[:, _]) for _ in headers]
-    ).set_index(lang.word("header"))
+    result, headers, groups = _describe(
+        data_frame, headers, chunksize, quantile_method, by, freq, n_jobs
+    )
+    if raw:
+        return (
+            result.reshape(-1, len(_STATS)),
+            _index(headers, groups),
+            _STATS,
+        )
+    return _frame(result, headers, Lang(lang), groups)
 
 
 if __name__ == "__main__":
@@ -129,6 +596,43 @@ if __name__ == "__main__":
         nargs="*",
         help="an string for the header in the dataset",
     )
+    ap.add_argument(
+        "-c",
+        "--chunksize",
+        type=int,
+        help="""Number of rows read per chunk. The dataset is streamed and the
+        quartiles, median, limits and absolute deviation are approximated,
+        except with freq (default: None).""",
+    )
+    ap.add_argument(
+        "-q",
+        "--quantile-method",
+        type=str,
+        help="""method for the quartiles, median and limits {'exact',
+        'sketch'} (default: 'exact', 'sketch' with chunksize)""",
+    )
+    ap.add_argument(
+        "-b",
+        "--by",
+        type=str,
+        nargs="*",
+        help="""Headers of the key columns to describe each group of rows
+        (default: None).""",
+    )
+    ap.add_argument(
+        "-fq",
+        "--freq",
+        type=str,
+        help="""Frequency of the time buckets to describe (e.g. '1h', 'D'),
+        the index must be the datetime column (default: None).""",
+    )
+    ap.add_argument(
+        "-j",
+        "--n-jobs",
+        type=int,
+        help="""Number of processes to describe the headers, -1 for all the
+        CPUs (default: None).""",
+    )
     args = vars(ap.parse_args())
 
     # If exist parse_dates, creates a structure with column name datetime
@@ -141,9 +645,14 @@ if __name__ == "__main__":
             args["dataset"],
             parse_dates=args["parse_dates"],
             index_col=args["index"],
+            chunksize=args["chunksize"],
         ),
         lang=args["lang"],
         headers=args["headers"],
+        quantile_method=args["quantile_method"],
+        by=args["by"] or None,
+        freq=args["freq"],
+        n_jobs=args["n_jobs"],
     )
     # Output in json format
     result = result.to_json(
@@ -5,67 +5,624 @@ The find module supplies one function,
     ewm()
 """
 
+from numba import njit
 import pandas as pd
+import numpy as np
 
 
-def ewm(
-    data_frame: pd.DataFrame,
+# Statistics of the exponential weighted engine, in code order
+EWM_TYPES = ("mean", "var", "std")
+_MEAN, _VAR, _STD = range(len(EWM_TYPES))
+
+# Statistics of the pairs of columns, computed apart from the other ones
+PAIR_TYPES = ("cov", "corr")
+_COV, _CORR = range(len(EWM_TYPES), len(EWM_TYPES) + len(PAIR_TYPES))
+
+
+def _alpha(
     com: float = None,
     span: float = None,
     halflife: float = None,
     alpha: float = None,
+) -> float:
+    """Smoothing factor of the decay given as in pandas.DataFrame.ewm"""
+    if sum(_ is not None for _ in (com, span, halflife, alpha)) > 1:
+        raise ValueError(
+            "com, span, halflife, and alpha are mutually exclusive"
+        )
+    if com is not None:
+        if com < 0:
+            raise ValueError("com must satisfy: com >= 0")
+    elif span is not None:
+        if span < 1:
+            raise ValueError("span must satisfy: span >= 1")
+        com = (span - 1) / 2
+    elif halflife is not None:
+        if halflife <= 0:
+            raise ValueError("halflife must satisfy: halflife > 0")
+        com = 1 / (1 - np.exp(np.log(0.5) / halflife)) - 1
+    elif alpha is not None:
+        if alpha <= 0 or alpha > 1:
+            raise ValueError("alpha must satisfy: 0 < alpha <= 1")
+        com = (1 - alpha) / alpha
+    else:
+        raise ValueError("Must pass one of com, span, halflife, or alpha")
+    return 1 / (1 + float(com))
+
+
+def _halflife(halflife) -> float:
+    """Length in nanoseconds of a halflife given as a timedelta (e.g. "4h"),
+    None for a halflife of a number of rows
+
+    Raises
+    ------
+    ValueError
+        Non-positive timedelta
+    """
+    if halflife is None or isinstance(halflife, (int, float, np.number)):
+        return None
+    nanos = pd.Timedelta(halflife).value
+    if nanos <= 0:
+        raise ValueError("halflife must satisfy: halflife > 0")
+    return float(nanos)
+
+
+def _alphas(
+    com: float or [float] = None,
+    span: float or [float] = None,
+    halflife: float or str or [float or str] = None,
+    alpha: float or [float] = None,
+) -> (np.ndarray, np.ndarray, list):
+    """Smoothing factors of the decays given as in pandas.DataFrame.ewm, or
+    as lists of them, the halflives in nanoseconds of the decays over time
+    (empty for decays over rows) and the given values, their labels
+
+    Raises
+    ------
+    ValueError
+        Halflives mixing numbers and timedeltas, or an empty list of decays
+    """
+    given = {
+        name: value
+        for name, value in zip(
+            ("com", "span", "halflife", "alpha"), (com, span, halflife, alpha)
+        )
+        if value is not None
+    }
+    if len(given) != 1:
+        return np.array([_alpha(**given)]), np.empty(0), [None]
+
+    ((name, values),) = given.items()
+    labels = [None]
+    if isinstance(values, (list, tuple)):
+        labels = values = list(values)
+        if not values:
+            raise ValueError(f"{name} must be given at least one value")
+    else:
+        values = [values]
+    if name == "halflife":
+        halflives = [_halflife(_) for _ in values]
+        if any(_ is not None for _ in halflives):
+            if not all(_ is not None for _ in halflives):
+                raise ValueError("halflife mixes numbers and timedeltas")
+            # As pandas, the weights halve at each halflife of elapsed time
+            return np.full(len(values), 0.5), np.array(halflives), labels
+    alphas = [_alpha(**{name: _}) for _ in values]
+    return np.array(alphas, np.float64), np.empty(0), labels
+
+
+def _ewm_times(times: pd.Index, last: int = None) -> np.ndarray:
+    """Times of the rows in nanoseconds
+
+    Raises
+    ------
+    ValueError
+        Unsorted times, or before last
+    """
+    times = pd.DatetimeIndex(times)
+    if times.hasnans or not times.is_monotonic_increasing:
+        raise ValueError("times must be sorted")
+    times = times.values.astype("datetime64[ns]", copy=False).view(np.int64)
+    if last is not None and len(times) and times[0] < last:
+        raise ValueError("times must be sorted")
+    return times
+
+
+@njit(cache=True)
+def _ewm_column(x, alphas, decays, ignore_na, codes, out, state):
+    """Exponential weighted statistics of one column for several decays, in
+    a single pass, with the recurrences of pandas (adjust=True) for the
+    weighted mean and the bias corrected variance. state has a row per
+    decay with the mean, the weighted sum of squared deviations, the sum of
+    the weights and of their squares, the weight of the past and the number
+    of observations, and is updated in place, so a later call resumes the
+    recurrences. With decays (shape (alphas, rows), the factors of the time
+    elapsed since the previous row) the weights decay by them instead of by
+    the factors of the alphas. out has shape (alphas, codes, rows)"""
+    new_wt = 1.0
+    for i in range(x.size):
+        value = x[i]
+        is_observation = not np.isnan(value)
+        for a in range(alphas.size):
+            old_wt_factor = decays[a, i] if decays.size else 1.0 - alphas[a]
+            mean, cov, sum_wt = state[a, 0], state[a, 1], state[a, 2]
+            sum_wt2, old_wt, nobs = state[a, 3], state[a, 4], state[a, 5]
+            nobs += is_observation
+            if not np.isnan(mean):
+                if is_observation or not ignore_na:
+                    sum_wt *= old_wt_factor
+                    sum_wt2 *= old_wt_factor * old_wt_factor
+                    old_wt *= old_wt_factor
+                    if is_observation:
+                        old_mean = mean
+                        # Avoids numerical errors on constant series
+                        if mean != value:
+                            mean = (old_wt * old_mean + new_wt * value) / (
+                                old_wt + new_wt
+                            )
+                        cov = (
+                            old_wt
+                            * (cov + (old_mean - mean) * (old_mean - mean))
+                            + new_wt * ((value - mean) * (value - mean))
+                        ) / (old_wt + new_wt)
+                        sum_wt += new_wt
+                        sum_wt2 += new_wt * new_wt
+                        old_wt += new_wt
+            elif is_observation:
+                mean = value
+
+            for c in range(codes.size):
+                result = np.nan
+                if nobs:
+                    if codes[c] == _MEAN:
+                        result = mean
+                    else:
+                        numerator = sum_wt * sum_wt
+                        denominator = numerator - sum_wt2
+                        if denominator > 0:
+                            result = numerator / denominator * cov
+                            if codes[c] == _STD:
+                                result = np.sqrt(max(result, 0))
+                out[a, c, i] = result
+
+            state[a, 0], state[a, 1], state[a, 2] = mean, cov, sum_wt
+            state[a, 3], state[a, 4], state[a, 5] = sum_wt2, old_wt, nobs
+
+
+@njit(cache=True)
+def _ewm_decays(times, last, halflives):
+    """Factors by which the weights decay at each row, halving at each
+    halflife of the time elapsed since the previous row (last for the first
+    one), of shape (halflives, rows)"""
+    decays = np.empty((halflives.size, times.size))
+    for i in range(times.size):
+        delta = float(times[i] - last)
+        last = times[i]
+        for a in range(halflives.size):
+            decays[a, i] = np.exp2(-delta / halflives[a])
+    return decays
+
+
+@njit(cache=True)
+def _ewm_pairs(values, alphas, decays, ignore_na, corr, slots, out, state):
+    """Exponential weighted covariance (bias corrected) or correlation of
+    every pair of columns of values (rows, columns), over the rows where
+    both are non-NaN, with the recurrences of pandas (adjust=True). state
+    has a row per pair (i <= j) and decay with the means of both, their
+    weighted co-moment and moments, the sum of the weights and of their
+    squares, the weight of the past and the number of observations. The
+    matrices of the rows of slot s >= 0 are written in out[s], of shape
+    (columns, columns, alphas)"""
+    new_wt = 1.0
+    n_columns = values.shape[1]
+    for r in range(values.shape[0]):
+        slot = slots[r]
+        p = 0
+        for i in range(n_columns):
+            x = values[r, i]
+            for j in range(i, n_columns):
+                y = values[r, j]
+                is_observation = not (np.isnan(x) or np.isnan(y))
+                for a in range(alphas.size):
+                    old_wt_factor = (
+                        decays[a, r] if decays.size else 1.0 - alphas[a]
+                    )
+                    mean_x, mean_y = state[p, a, 0], state[p, a, 1]
+                    cov, var_x, var_y = (
+                        state[p, a, 2],
+                        state[p, a, 3],
+                        state[p, a, 4],
+                    )
+                    sum_wt, sum_wt2, old_wt = (
+                        state[p, a, 5],
+                        state[p, a, 6],
+                        state[p, a, 7],
+                    )
+                    nobs = state[p, a, 8] + is_observation
+                    if not np.isnan(mean_x):
+                        if is_observation or not ignore_na:
+                            sum_wt *= old_wt_factor
+                            sum_wt2 *= old_wt_factor * old_wt_factor
+                            old_wt *= old_wt_factor
+                            if is_observation:
+                                old_mean_x, old_mean_y = mean_x, mean_y
+                                total = old_wt + new_wt
+                                if mean_x != x:
+                                    mean_x = (
+                                        old_wt * old_mean_x + new_wt * x
+                                    ) / total
+                                if mean_y != y:
+                                    mean_y = (
+                                        old_wt * old_mean_y + new_wt * y
+                                    ) / total
+                                dx = old_mean_x - mean_x
+                                dy = old_mean_y - mean_y
+                                ex, ey = x - mean_x, y - mean_y
+                                cov = (
+                                    old_wt * (cov + dx * dy)
+                                    + new_wt * (ex * ey)
+                                ) / total
+                                if corr:
+                                    var_x = (
+                                        old_wt * (var_x + dx * dx)
+                                        + new_wt * (ex * ex)
+                                    ) / total
+                                    var_y = (
+                                        old_wt * (var_y + dy * dy)
+                                        + new_wt * (ey * ey)
+                                    ) / total
+                                sum_wt += new_wt
+                                sum_wt2 += new_wt * new_wt
+                                old_wt += new_wt
+                    elif is_observation:
+                        mean_x, mean_y = x, y
+
+                    if slot >= 0 and nobs:
+                        result = np.nan
+                        if corr:
+                            denominator = var_x * var_y
+                            if denominator > 0:
+                                result = cov / np.sqrt(denominator)
+                        else:
+                            numerator = sum_wt * sum_wt
+                            denominator = numerator - sum_wt2
+                            if denominator > 0:
+                                result = numerator / denominator * cov
+                        out[slot, i, j, a] = result
+                        out[slot, j, i, a] = result
+
+                    state[p, a, 0], state[p, a, 1] = mean_x, mean_y
+                    state[p, a, 2], state[p, a, 3] = cov, var_x
+                    state[p, a, 4], state[p, a, 5] = var_y, sum_wt
+                    state[p, a, 6], state[p, a, 7] = sum_wt2, old_wt
+                    state[p, a, 8] = nobs
+                p += 1
+
+
+@njit(cache=True)
+def _ewm_block(values, alphas, decays, ignore_na, codes, state):
+    out = np.empty(
+        (values.shape[0], alphas.size, codes.size, values.shape[1])
+    )
+    for j in range(values.shape[0]):
+        _ewm_column(
+            values[j], alphas, decays, ignore_na, codes, out[j], state[j]
+        )
+    return out
+
+
+def _ewm_state(
+    n_columns: int,
+    n_alphas: int = 1,
+    pairwise: bool = False,
+    dtype: type = np.float64,
+) -> np.ndarray:
+    """Empty state of the recurrences, of each column or pair of columns:
+    no mean yet and unit weights"""
+    if pairwise:
+        state = np.zeros((n_columns * (n_columns + 1) // 2, n_alphas, 9))
+        state[:, :, 0:2] = np.nan
+        state[:, :, 5:8] = 1
+        return state.astype(dtype)
+    state = np.zeros((n_columns, n_alphas, 6))
+    state[:, :, 0] = np.nan
+    state[:, :, 2:5] = 1
+    return state
+
+
+def _ewm_resume(
+    checkpoint: dict,
+    alphas: np.ndarray,
+    halflives: np.ndarray,
+    headers: list,
+    state: np.ndarray,
+) -> np.ndarray:
+    """State of the recurrences saved in a checkpoint (see ewm), or the
+    empty state
+
+    Raises
+    ------
+    ValueError
+        Checkpoint of other decays, headers or statistics
+    """
+    if not checkpoint.get("values"):
+        return state
+    values = np.array(checkpoint["values"], dtype=state.dtype)
+    if (
+        checkpoint["alphas"] != alphas.tolist()
+        or checkpoint.get("halflives", []) != halflives.tolist()
+        or checkpoint["headers"] != headers
+        or values.shape != state.shape
+    ):
+        raise ValueError("state of other decays, headers or ewm_type")
+    return values
+
+
+def _ewm_chunks(
+    chunks,
+    alphas: np.ndarray,
+    halflives: np.ndarray,
+    labels: list,
+    ignore_na: bool,
+    codes: np.ndarray,
+    headers: [str],
+    times: str or np.ndarray = None,
+    checkpoint: dict = None,
+    step: int = 1,
+    dtype: type = np.float64,
+):
+    """Exponential weighted statistics of a series given as an iterable of
+    dataframes, yielding the result of each one, and saving the state of the
+    recurrences in checkpoint after each one. With halflives, the rows are
+    at the times of the column named times, of the given times, or of the
+    index. The matrices of the pairs are yielded every step rows (of the
+    whole series), or for the last row of each dataframe if step is None
+
+    Raises
+    ------
+    ValueError
+        Decays over time without a datetime index or times, or unsorted
+    """
+    pairwise = codes[0] in (_COV, _CORR)
+    state = None
+    row = 0
+    last = None
+    if checkpoint and checkpoint.get("time") is not None:
+        last = pd.Timestamp(checkpoint["time"]).value
+    for data_frame in chunks:
+        decays = np.empty((0, 0))
+        if halflives.size:
+            if isinstance(times, str):
+                chunk_times = data_frame[times]
+            elif times is not None:
+                chunk_times = times[slice(row, row + len(data_frame))]
+            elif isinstance(data_frame.index, pd.DatetimeIndex):
+                chunk_times = data_frame.index
+            else:
+                raise ValueError(
+                    "halflife as a timedelta needs times or a datetime index"
+                )
+            chunk_times = _ewm_times(chunk_times, last)
+            if last is None and len(chunk_times):
+                last = int(chunk_times[0])
+            decays = _ewm_decays(chunk_times, last or 0, halflives)
+            if len(chunk_times):
+                last = int(chunk_times[-1])
+        first = row
+        row += len(data_frame)
+
+        if headers:
+            data_frame = data_frame.loc[:, headers]
+        elif isinstance(times, str):
+            data_frame = data_frame.drop(columns=times)
+        if state is None:
+            columns = list(data_frame.columns)
+            state = _ewm_state(len(columns), alphas.size, pairwise, dtype)
+            if checkpoint is not None:
+                state = _ewm_resume(
+                    checkpoint, alphas, halflives, columns, state
+                )
+        if pairwise:
+            # Slot of each row in the emitted matrices, -1 if not emitted
+            slots = np.full(len(data_frame), -1, np.int64)
+            emitted = np.arange(len(data_frame))
+            if step is None:
+                emitted = emitted[slice(-1, None)]
+            else:
+                emitted = emitted[(first + emitted + 1) % step == 0]
+            slots[emitted] = np.arange(emitted.size)
+            result = np.full(
+                (emitted.size, len(columns), len(columns), alphas.size),
+                np.nan,
+                dtype,
+            )
+            _ewm_pairs(
+                np.ascontiguousarray(data_frame.to_numpy(dtype=np.float64)),
+                alphas,
+                decays,
+                ignore_na,
+                codes[0] == _CORR,
+                slots,
+                result,
+                state,
+            )
+        else:
+            result = _ewm_block(
+                np.ascontiguousarray(
+                    data_frame.to_numpy(dtype=np.float64).T
+                ),
+                alphas,
+                decays,
+                ignore_na,
+                codes,
+                state,
+            )
+        if checkpoint is not None:
+            checkpoint.update(
+                {
+                    "alphas": alphas.tolist(),
+                    "halflives": halflives.tolist(),
+                    "headers": columns,
+                    "values": state.tolist(),
+                }
+            )
+            if halflives.size and last is not None:
+                checkpoint["time"] = str(pd.Timestamp(last))
+            elif len(data_frame) and isinstance(
+                data_frame.index, pd.DatetimeIndex
+            ):
+                checkpoint["time"] = str(data_frame.index[-1])
+
+        result_columns = data_frame.columns
+        if labels != [None]:
+            result_columns = pd.MultiIndex.from_product(
+                [result_columns, labels]
+            )
+        if pairwise:
+            index = pd.MultiIndex.from_product(
+                [data_frame.index[emitted], data_frame.columns]
+            )
+            yield pd.DataFrame(
+                result.reshape(len(index), len(result_columns)),
+                index=index,
+                columns=result_columns,
+            )
+            continue
+        yield pd.DataFrame(
+            result[:, :, 0].reshape(len(result_columns), len(data_frame)).T,
+            index=data_frame.index,
+            columns=result_columns,
+        )
+
+
+def ewm(
+    data_frame: pd.DataFrame,
+    com: float or [float] = None,
+    span: float or [float] = None,
+    halflife: float or str or [float or str] = None,
+    alpha: float or [float] = None,
     ignore_na: bool = False,
     ewm_type: str = "mean",
     headers: [str] = None,
+    state: dict = None,
+    times: str or pd.DatetimeIndex = None,
+    step: int = 1,
+    dtype: type = np.float64,
 ) -> pd.DataFrame:
     """This function provide exponential weighted functions. This is a adapted
     ewm function of pandas package.
 
+    The recurrences of pandas are run in a compiled single pass over each
+    column. In chunked mode (data_frame given as an iterable of dataframes,
+    as returned by pd.read_csv with chunksize) the running weighted state is
+    carried from a chunk to the next, and the results are yielded chunk by
+    chunk, equal to the ones of the whole dataframe.
+
+    Several decays (a list of com, span, halflife or alpha) are computed in
+    the same pass, and the output gets a column per header and decay. The
+    final state of the recurrences (means, weighted sums of squares, sums of
+    weights and last timestamp) can be kept in state, a JSON compatible
+    dict, and a later call given it resumes from there on the next rows.
+
+    With halflife given as a timedelta (e.g. "4h"), the rows are taken at
+    their times (the datetime index, by default) and the weights decay with
+    the elapsed time instead of the number of rows: a weight halves at each
+    halflife, over irregular series too. This is the times mode of pandas,
+    here also for the variance and the standard deviation.
+
+    The covariance and correlation of every pair of columns ('cov' and
+    'corr', as pandas.DataFrame.ewm().cov() and .corr()) are updated in the
+    same single pass over the rows, from the weighted co-moments of each
+    pair over the rows where both values are non-NaN, and returned as the
+    (rows, headers, headers) matrices, indexed by (index, header). The
+    matrices can be emitted every step rows only, or only for the latest
+    row, and accumulated in float32 to halve the memory of wide frames.
+
     Parameters
     ----------
     data_frame : pd.DataFrame
         input dataframe
-    com : float, optional
-        See pandas.DataFrame.ewm, by default None
-    span : float, optional
-        See pandas.DataFrame.ewm, by default None
-    halflife : float, optional
-        See pandas.DataFrame.ewm, by default None
-    alpha : float, optional
-        See pandas.DataFrame.ewm, by default None
+    com : float or [float], optional
+        See pandas.DataFrame.ewm, or a list of them, by default None
+    span : float or [float], optional
+        See pandas.DataFrame.ewm, or a list of them, by default None
+    halflife : float or str or [float or str], optional
+        See pandas.DataFrame.ewm, or a list of them, by default None. A
+        timedelta (e.g. "4h") decays over the times
+    alpha : float or [float], optional
+        See pandas.DataFrame.ewm, or a list of them, by default None
     ignore_na : bool, optional
         See pandas.DataFrame.ewm, by default False
     ewm_type : str, optional
-        {‘mean’, ‘var’, 'std'}, by default "mean"
+        {‘mean’, ‘var’, 'std', 'cov', 'corr'}, by default "mean"
     headers : [type], optional
         chosen dataframe headers, by default None
+    state : dict, optional
+        Checkpoint to resume from, updated in place with the final state,
+        by default None. An empty dict starts from scratch
+    times : str or pd.DatetimeIndex, optional
+        Times of the rows for a halflife given as a timedelta, the header of
+        a datetime column or the times themselves, by default the datetime
+        index
+    step : int, optional
+        For 'cov' and 'corr', rows between the emitted matrices, by default
+        1 (every row). None emits only the matrix of the latest row (of
+        each chunk, in chunked mode)
+    dtype : type, optional
+        For 'cov' and 'corr', type of the state and matrices, by default
+        np.float64. np.float32 halves their memory
 
     Returns
     -------
     pd.DataFrame
-        A Window sub-classed for the particular operation
-    """
-    ewm = {
-        "mean": lambda ewm: ewm.mean(),
-        "var": lambda ewm: ewm.var(),
-        "std": lambda ewm: ewm.std(),
-    }
+        A Window sub-classed for the particular operation, a generator of
+        them in chunked mode. With a list of decays, the columns are a
+        MultiIndex of (header, decay). For 'cov' and 'corr', a dataframe of
+        (index, header) rows
 
-    if headers:
-        data_frame = data_frame.loc[:, headers]
-    return ewm[ewm_type](
-        data_frame.ewm(
-            com=com,
-            span=span,
-            halflife=halflife,
-            alpha=alpha,
-            ignore_na=ignore_na,
-        )
+    Raises
+    ------
+    ValueError
+        Unsupported ewm_type, none or several of com, span, halflife and
+        alpha, an empty list of them, or out of their domain, or a state of
+        other decays or headers, or times without a halflife as a timedelta,
+        or unsorted, or step or dtype without 'cov' or 'corr', or step lower
+        than 1
+    """
+    if ewm_type not in EWM_TYPES + PAIR_TYPES:
+        raise ValueError(f"unsupported ewm_type {ewm_type}")
+    if ewm_type in PAIR_TYPES:
+        if step is not None and step < 1:
+            raise ValueError("step must be at least 1")
+    elif step != 1 or np.dtype(dtype) != np.float64:
+        raise ValueError("step and dtype are only for cov and corr")
+    alphas, halflives, labels = _alphas(com, span, halflife, alpha)
+    if times is not None:
+        if not halflives.size:
+            raise ValueError("times need a halflife as a timedelta")
+        if not isinstance(times, str):
+            times = _ewm_times(times)
+    chunks = _ewm_chunks(
+        [data_frame] if isinstance(data_frame, pd.DataFrame) else data_frame,
+        alphas,
+        halflives,
+        labels,
+        ignore_na,
+        np.array([(EWM_TYPES + PAIR_TYPES).index(ewm_type)], np.int64),
+        headers,
+        times,
+        state,
+        step,
+        dtype,
     )
+    return next(chunks) if isinstance(data_frame, pd.DataFrame) else chunks
 
 
 if __name__ == "__main__":
     import argparse
+    import json
+    import os
+    import sys
 
     # construct the argument parser and parse the arguments
     ap = argparse.ArgumentParser()
@@ -79,10 +636,9 @@ if __name__ == "__main__":
         "-o",
         "--orient",
         type=str,
-        default="columns",
         help="""format json output
         {'split', 'records', 'index', 'values', 'table', 'columns'}
-        (default: 'columns')""",
+        (default: 'columns', 'records' with chunksize)""",
     )
     ap.add_argument(
         "-pd",
@@ -106,14 +662,88 @@ if __name__ == "__main__":
         nargs="*",
         help="an string for the header in the dataset",
     )
-    ap.add_argument("--com", type=float, default=None)
-    ap.add_argument("--span", type=float, default=None)
-    ap.add_argument("--halflife", type=float, default=None)
-    ap.add_argument("--alpha", type=float, default=None)
+    ap.add_argument("--com", type=float, nargs="+", default=None)
+    ap.add_argument("--span", type=float, nargs="+", default=None)
+    ap.add_argument(
+        "--halflife",
+        type=str,
+        nargs="+",
+        default=None,
+        help="""Halflife(s), in rows, or as a timedelta over the times (e.g.
+        4h). The times are the datetime column of --parse-dates, the index or
+        the --times column (default: None).""",
+    )
+    ap.add_argument("--alpha", type=float, nargs="+", default=None)
     ap.add_argument("--ignore-na", type=bool, default=False)
     ap.add_argument("--ewm-type", type=str, default="mean")
+    ap.add_argument(
+        "--chunksize",
+        type=int,
+        help="""Number of rows read per chunk. The dataset is streamed and the
+        output is written chunk by chunk in json lines, so only the 'records'
+        orient can be used (default: None).""",
+    )
+    ap.add_argument(
+        "--times",
+        type=str,
+        help="""Header of the column of the times of a halflife as a timedelta
+        (default: None).""",
+    )
+    ap.add_argument(
+        "--step",
+        type=int,
+        default=1,
+        help="""For cov and corr, rows between the emitted matrices, 0 for only
+        the latest one (default: 1).""",
+    )
+    ap.add_argument(
+        "--float32",
+        action="store_true",
+        help="For cov and corr, accumulates in float32 (default: False).",
+    )
+    ap.add_argument(
+        "--state",
+        type=str,
+        help="""Path to a json checkpoint of the ewm state. If it exists the
+        ewm resumes from it, and it is rewritten with the final state
+        (default: None).""",
+    )
     args = vars(ap.parse_args())
 
+    # Chunks are written as json lines, one record per line
+    if args["chunksize"] and args["orient"] not in (None, "records"):
+        ap.error("argument -o/--orient: only 'records' with --chunksize")
+
+    # The halflives are numbers of rows or timedeltas
+    if args["halflife"]:
+        args["halflife"] = [
+            float(_) if _.replace(".", "", 1).isdigit() else _
+            for _ in args["halflife"]
+        ]
+
+    # The times of the parsed dates, if not set as index
+    if (
+        args["halflife"]
+        and isinstance(args["halflife"][0], str)
+        and not args["times"]
+        and args["parse_dates"]
+        and "datetime" not in (args["index"] or [])
+    ):
+        args["times"] = "datetime"
+
+    # A single decay is given as a scalar, several as a list
+    for _ in ("com", "span", "halflife", "alpha"):
+        if args[_] and len(args[_]) == 1:
+            args[_] = args[_][0]
+
+    # Checkpoint of a previous run
+    state = None
+    if args["state"]:
+        state = {}
+        if os.path.exists(args["state"]):
+            with open(args["state"]) as checkpoint:
+                state = json.load(checkpoint)
+
     # If exist parse_dates, creates a structure with column name datetime
     if args["parse_dates"]:
         args["parse_dates"] = {"datetime": args["parse_dates"]}
@@ -124,6 +754,7 @@ if __name__ == "__main__":
             args["dataset"],
             parse_dates=args["parse_dates"],
             index_col=args["index"],
+            chunksize=args["chunksize"],
         ),
         com=args["com"],
         span=args["span"],
@@ -132,11 +763,37 @@ if __name__ == "__main__":
         ignore_na=args["ignore_na"],
         ewm_type=args["ewm_type"],
         headers=args["headers"],
+        state=state,
+        times=args["times"],
+        step=args["step"] or None,
+        dtype=np.float32 if args["float32"] else np.float64,
     )
 
-    # Output in json format
-    result = result.to_json(
-        args.get("file_out"), force_ascii=False, orient=args["orient"]
-    )
-    if result:
-        print(result)
+    # Output in json lines format, chunk by chunk
+    if args["chunksize"]:
+        out = open(args["file_out"], "w") if args["file_out"] else sys.stdout
+        for chunk in result:
+            out.write(
+                chunk.reset_index()
+                .to_json(force_ascii=False, orient="records", lines=True)
+                .rstrip("\n")
+                + "\n"
+            )
+        if out is not sys.stdout:
+            out.close()
+    else:
+        # Output in json format, the pairs with their rows
+        if args["ewm_type"] in PAIR_TYPES:
+            result = result.reset_index()
+        result = result.to_json(
+            args.get("file_out"),
+            force_ascii=False,
+            orient=args["orient"] or "columns",
+        )
+        if result:
+            print(result)
+
+    # Checkpoint of the final state
+    if args["state"]:
+        with open(args["state"], "w") as checkpoint:
+            json.dump(state, checkpoint)
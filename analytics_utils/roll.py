@@ -5,47 +5,1347 @@ The find module supplies one function,
     roll()
 """
 
+from numba import njit
+from pandas.tseries.frequencies import to_offset
 import pandas as pd
+import numpy as np
+
+
+# Statistics of the rolling engine, in code order
+ROLL_TYPES = (
+    "sum",
+    "mean",
+    "var",
+    "std",
+    "min",
+    "max",
+    "median",
+    "quantile",
+    "skew",
+    "kurt",
+)
+(
+    _SUM,
+    _MEAN,
+    _VAR,
+    _STD,
+    _MIN,
+    _MAX,
+    _MEDIAN,
+    _QUANTILE,
+    _SKEW,
+    _KURT,
+) = range(len(ROLL_TYPES))
+
+
+@njit(cache=True)
+def _kahan(total, compensation, value):
+    y = value - compensation
+    t = total + y
+    return t, t - total - y
+
+
+@njit(cache=True)
+def _height(position, levels):
+    """Number of levels of the skiplist node of a row position, geometric of
+    ratio 1/2 (drawn from a hash of the position, so a sweep is
+    reproducible and resumable)"""
+    h = (position + 1) * 6364136223846793005
+    h ^= h >> 32
+    h *= 1442695040888963407
+    h >>= 24
+    height = 1
+    while height < levels and h & 1:
+        height += 1
+        h >>= 1
+    return height
+
+
+@njit(cache=True)
+def _skiplist_insert(nodes, links, node, value, height, chain, steps):
+    """Inserts value in the node of an indexable skiplist, after the equal
+    values. nodes holds the values and links, of shape (nodes + 1, levels,
+    2), the next node (-1 at the end) and the width (in ranks) of each link,
+    the last node being the head"""
+    current = nodes.size
+    for level in range(links.shape[1] - 1, -1, -1):
+        steps[level] = 0
+        following = links[current, level, 0]
+        while following >= 0 and nodes[following] <= value:
+            steps[level] += links[current, level, 1]
+            current = following
+            following = links[current, level, 0]
+        chain[level] = current
+
+    nodes[node] = value
+    width = 0
+    for level in range(height):
+        previous = chain[level]
+        links[node, level, 0] = links[previous, level, 0]
+        links[previous, level, 0] = node
+        links[node, level, 1] = links[previous, level, 1] - width
+        links[previous, level, 1] = width + 1
+        width += steps[level]
+    for level in range(height, links.shape[1]):
+        links[chain[level], level, 1] += 1
+
+
+@njit(cache=True)
+def _skiplist_remove(nodes, links, value, height, chain):
+    """Removes the first node of value (the oldest one, values being
+    inserted after their equals) from the skiplist, height being its number
+    of levels"""
+    current = nodes.size
+    for level in range(links.shape[1] - 1, -1, -1):
+        following = links[current, level, 0]
+        while following >= 0 and nodes[following] < value:
+            current = following
+            following = links[current, level, 0]
+        chain[level] = current
+
+    for level in range(height):
+        previous = chain[level]
+        removed = links[previous, level, 0]
+        links[previous, level, 1] += links[removed, level, 1] - 1
+        links[previous, level, 0] = links[removed, level, 0]
+    for level in range(height, links.shape[1]):
+        links[chain[level], level, 1] -= 1
+
+
+@njit(cache=True)
+def _skiplist_node(nodes, links, rank):
+    """Node of the value of rank (from 0) in the skiplist"""
+    current = nodes.size
+    rank += 1
+    for level in range(links.shape[1] - 1, -1, -1):
+        while links[current, level, 1] <= rank:
+            rank -= links[current, level, 1]
+            current = links[current, level, 0]
+    return current
+
+
+@njit(cache=True)
+def _ranked(nodes, links, skiplist, nobs, q, median):
+    """Linear interpolated quantile q of the nobs values in order, or the
+    median (mean of the middle values)"""
+    rank = q * (nobs - 1)
+    low = int(np.floor(rank))
+    node = _skiplist_node(nodes, links, low) if skiplist else low
+    result = nodes[node]
+    if rank > low:
+        following = nodes[links[node, 0, 0] if skiplist else node + 1]
+        if median:
+            return (result + following) / 2
+        result += (following - result) * (rank - low)
+    return result
+
+
+@njit(cache=True)
+def _roll_column(
+    x,
+    base,
+    start,
+    end,
+    min_periods,
+    codes,
+    qs,
+    out,
+    floats,
+    ints,
+    deques,
+    nodes,
+    links,
+    scratch,
+):
+    """Rolling statistics of one column over the windows [start[i], end[i])
+    (absolute row positions, both non-decreasing), in one sweep: every value
+    is added and removed once from a shared state (Kahan sums, Welford
+    moments, shifted power sums, monotonic deques of positions and the
+    values in order), and each requested statistic is read from it. x holds
+    the rows from the position base on, and the state (see _roll_state) is
+    updated in place, so a later call resumes the sweep. out has shape
+    (codes, windows) and scratch, of shape (2, levels), is the work space of
+    the skiplist"""
+    n = start.size
+    need = np.zeros(len(ROLL_TYPES), np.bool_)
+    for code in codes:
+        need[code] = True
+    need[_SUM] |= need[_MEAN]
+    need[_VAR] |= need[_STD]
+    need[_MEDIAN] |= need[_QUANTILE]
+    need[_SKEW] |= need[_KURT]
+
+    need_sum, need_var, need_min, need_max, need_median, need_skew = (
+        need[_SUM],
+        need[_VAR],
+        need[_MIN],
+        need[_MAX],
+        need[_MEDIAN],
+        need[_SKEW],
+    )
+
+    total, compensation, mean = floats[0], floats[1], floats[2]
+    ssqdm, previous, shift = floats[3], floats[4], floats[5]
+    powers, powers_compensation = floats[6:10], floats[10:14]
+    nobs, negative, same = ints[0], ints[1], ints[2]
+    last_start, last_end = ints[3], ints[4]
+    min_head, min_tail, max_head, max_tail = ints[5], ints[6], ints[7], ints[8]
+    shifted = ints[9]
+    min_deque, max_deque = deques[0], deques[1]
+    # The deques are rings of a power of two size, indexed with a mask
+    mask = min_deque.size - 1
+    # The values in order are an indexable skiplist (O(log window) updates
+    # and rank queries) when links holds nodes, whose node of a row is its
+    # slot in the rings, otherwise a sorted buffer in nodes (O(window)
+    # updates, faster for small windows)
+    skiplist = links.shape[0] > 1
+    levels = links.shape[1]
+    chain, steps = scratch[0], scratch[1]
+
+    for i in range(n):
+        first, stop = start[i], end[i]
+
+        for j in range(last_start, min(first, last_end)):
+            value = x[j - base]
+            if np.isnan(value):
+                continue
+            nobs -= 1
+            negative -= value < 0
+            if need_sum:
+                total, compensation = _kahan(total, compensation, -value)
+            if need_var:
+                if nobs:
+                    delta = value - mean
+                    mean -= delta / nobs
+                    ssqdm -= delta * (value - mean)
+            if need_skew:
+                power = 1.0
+                for h in range(4):
+                    power *= value - shift
+                    powers[h], powers_compensation[h] = _kahan(
+                        powers[h], powers_compensation[h], -power
+                    )
+            if need_median and skiplist:
+                _skiplist_remove(
+                    nodes, links, value, _height(j & mask, levels), chain
+                )
+            elif need_median:
+                position = np.searchsorted(nodes[:nobs + 1], value)
+                for h in range(position, nobs):
+                    nodes[h] = nodes[h + 1]
+            if not nobs:
+                # An empty window drops the rounding residue of the sums
+                total = compensation = mean = ssqdm = 0.0
+                powers[:] = 0.0
+                powers_compensation[:] = 0.0
+
+        for j in range(max(first, last_end), stop):
+            value = x[j - base]
+            if np.isnan(value):
+                continue
+            nobs += 1
+            negative += value < 0
+            same = same + 1 if value == previous else 1
+            previous = value
+            if need_sum:
+                total, compensation = _kahan(total, compensation, value)
+            if need_var:
+                delta = value - mean
+                mean += delta / nobs
+                ssqdm += delta * (value - mean)
+            if need_skew:
+                # Power sums are shifted by the first value of the column,
+                # limiting the cancellation
+                if not shifted:
+                    shift, shifted = value, 1
+                power = 1.0
+                for h in range(4):
+                    power *= value - shift
+                    powers[h], powers_compensation[h] = _kahan(
+                        powers[h], powers_compensation[h], power
+                    )
+            if need_min:
+                while min_tail > min_head and (
+                    x[min_deque[(min_tail - 1) & mask] - base] >= value
+                ):
+                    min_tail -= 1
+                min_deque[min_tail & mask] = j
+                min_tail += 1
+            if need_max:
+                while max_tail > max_head and (
+                    x[max_deque[(max_tail - 1) & mask] - base] <= value
+                ):
+                    max_tail -= 1
+                max_deque[max_tail & mask] = j
+                max_tail += 1
+            if need_median and skiplist:
+                _skiplist_insert(
+                    nodes,
+                    links,
+                    j & mask,
+                    value,
+                    _height(j & mask, levels),
+                    chain,
+                    steps,
+                )
+            elif need_median:
+                position = np.searchsorted(nodes[:nobs - 1], value)
+                for h in range(nobs - 1, position, -1):
+                    nodes[h] = nodes[h - 1]
+                nodes[position] = value
+
+        while min_tail > min_head and (
+            min_deque[min_head & mask] < first
+        ):
+            min_head += 1
+        while max_tail > max_head and (
+            max_deque[max_head & mask] < first
+        ):
+            max_head += 1
+        last_start, last_end = first, stop
+
+        valid = nobs >= min_periods and nobs > 0
+        constant = same >= nobs
+        for c in range(codes.size):
+            code = codes[c]
+            result = np.nan
+            if code == _SUM:
+                if nobs >= min_periods:
+                    result = total if nobs else 0.0
+            elif code == _MEAN:
+                if valid:
+                    result = total / nobs
+                    # The sign of the mean follows the values in the window
+                    if negative == 0 and result < 0:
+                        result = 0.0
+                    elif negative == nobs and result > 0:
+                        result = 0.0
+            elif code == _VAR or code == _STD:
+                if valid and nobs > 1:
+                    result = 0.0 if constant else max(ssqdm, 0) / (nobs - 1)
+                    if code == _STD:
+                        result = np.sqrt(result)
+            elif code == _MIN:
+                if valid:
+                    result = x[min_deque[min_head & mask] - base]
+            elif code == _MAX:
+                if valid:
+                    result = x[max_deque[max_head & mask] - base]
+            elif code == _MEDIAN:
+                if valid:
+                    result = _ranked(
+                        nodes, links, skiplist, nobs, 0.5, True
+                    )
+            elif code == _QUANTILE:
+                if valid:
+                    result = _ranked(
+                        nodes, links, skiplist, nobs, qs[c], False
+                    )
+            elif code == _SKEW:
+                if valid and nobs >= 3:
+                    if constant:
+                        result = 0.0
+                    else:
+                        a = powers[0] / nobs
+                        b = powers[1] / nobs - a * a
+                        cc = powers[2] / nobs - a * a * a - 3 * a * b
+                        if b > 1e-14:
+                            result = (
+                                np.sqrt(nobs * (nobs - 1.0))
+                                * cc
+                                / ((nobs - 2) * b * np.sqrt(b))
+                            )
+            elif code == _KURT:
+                if valid and nobs >= 4:
+                    if constant:
+                        result = -3.0
+                    else:
+                        a = powers[0] / nobs
+                        b = powers[1] / nobs - a * a
+                        cc = powers[2] / nobs - a * a * a - 3 * a * b
+                        d = (
+                            powers[3] / nobs
+                            - a * a * a * a
+                            - 6 * b * a * a
+                            - 4 * cc * a
+                        )
+                        if b > 1e-14:
+                            k = (nobs * nobs - 1.0) * d / (
+                                b * b
+                            ) - 3 * (nobs - 1.0) ** 2
+                            result = k / ((nobs - 2.0) * (nobs - 3.0))
+            out[c, i] = result
+
+    floats[0], floats[1], floats[2] = total, compensation, mean
+    floats[3], floats[4], floats[5] = ssqdm, previous, shift
+    ints[0], ints[1], ints[2] = nobs, negative, same
+    ints[3], ints[4] = last_start, last_end
+    ints[5], ints[6], ints[7], ints[8] = min_head, min_tail, max_head, max_tail
+    ints[9] = shifted
+
+
+@njit(cache=True)
+def _roll_block(
+    values,
+    base,
+    start,
+    end,
+    min_periods,
+    codes,
+    qs,
+    floats,
+    ints,
+    deques,
+    nodes,
+    links,
+):
+    out = np.empty((values.shape[0], codes.size, start.size))
+    scratch = np.empty((2, links.shape[2]), np.int64)
+    for j in range(values.shape[0]):
+        _roll_column(
+            values[j],
+            base,
+            start,
+            end,
+            min_periods,
+            codes,
+            qs,
+            out[j],
+            floats[j],
+            ints[j],
+            deques[j],
+            nodes[j],
+            links[j],
+            scratch,
+        )
+    return out
+
+
+# Rows between two restarts of the prefix sums, at least the largest window
+_PREFIX_BLOCK = 1024
+
+
+@njit(cache=True)
+def _prefix_sums(sums, first, stop, restart):
+    """Compensated sums of the shifted values and of their squares of the
+    rows of positions [first, stop), inside one block of the prefix sums
+    (restart if first is the start of the block)"""
+    if restart:
+        return sums[0, stop] + sums[1, stop], sums[2, stop] + sums[3, stop]
+    return (
+        (sums[0, stop] - sums[0, first]) + (sums[1, stop] - sums[1, first]),
+        (sums[2, stop] - sums[2, first]) + (sums[3, stop] - sums[3, first]),
+    )
+
+
+@njit(cache=True)
+def _prefix_moments(n_a, s1_a, s2_a, shift_a, n_b, s1_b, s2_b, shift_b):
+    """Mean and sum of the squared deviations of the rows of a window split
+    in two parts by a restart of the prefix sums, each one given by its
+    count and its sums centered on its shift, merged with the pairwise
+    formulas of Chan et al."""
+    mean_b, m2_b = shift_b, 0.0
+    if n_b:
+        mean_b = shift_b + s1_b / n_b
+        m2_b = max(s2_b - s1_b * s1_b / n_b, 0)
+    if not n_a:
+        return mean_b, m2_b
+    mean_a = shift_a + s1_a / n_a
+    m2_a = max(s2_a - s1_a * s1_a / n_a, 0)
+    if not n_b:
+        return mean_a, m2_a
+    n = n_a + n_b
+    delta = mean_a - mean_b
+    return (
+        mean_b + delta * n_a / n,
+        m2_a + m2_b + delta * delta * n_a * n_b / n,
+    )
+
+
+@njit(cache=True)
+def _roll_prefix(
+    x, row, offset, windows, min_periods, codes, out, state, sums
+):
+    """Sum, mean, variance and standard deviation of one column for several
+    window sizes, by differencing prefix sums of the shifted values and of
+    their squares. The prefix sums restart every block of rows (at least the
+    largest window), shifted by the first value of the block, so they follow
+    the level of a drifting series; a window over a restart merges its two
+    parts. They are also compensated, each one kept as a (sum, lost
+    low-order part) pair. Next to them, prefix counts of the non-NaN and
+    negative values, the length of the run of equal values and the shift of
+    the block are kept.
+
+    sums holds, from the position offset on, the prefixes to fill for the
+    rows of x (the first one being the row-th of the series), and before
+    them the prefixes of the previous rows carried over from an earlier
+    call; state holds the running sums (see _roll_state), updated in place.
+    out has shape (windows, codes, rows)"""
+    n = x.size
+    block = max(windows.max(), _PREFIX_BLOCK)
+    total, compensation = state[0], state[1]
+    square, square_compensation = state[2], state[3]
+    previous, shift = state[4], state[5]
+    nobs, negative, same, shifted = state[6], state[7], state[8], state[9]
+    for i in range(n):
+        if (row + i) % block == 0:
+            total = compensation = square = square_compensation = 0.0
+            shifted = 0
+        value = x[i]
+        if not np.isnan(value):
+            nobs += 1
+            negative += value < 0
+            same = same + 1 if value == previous else 1
+            previous = value
+            # The values are shifted by the first one of the block: it
+            # centers them and keeps integer values exact
+            if not shifted:
+                shift, shifted = value, 1
+            value -= shift
+            total, compensation = _kahan(total, compensation, value)
+            square, square_compensation = _kahan(
+                square, square_compensation, value * value
+            )
+        position = offset + i + 1
+        sums[0, position] = total
+        sums[1, position] = -compensation
+        sums[2, position] = square
+        sums[3, position] = -square_compensation
+        sums[4, position] = nobs
+        sums[5, position] = negative
+        sums[6, position] = same
+        sums[7, position] = shift
+    state[0], state[1] = total, compensation
+    state[2], state[3] = square, square_compensation
+    state[4], state[5] = previous, shift
+    state[6], state[7], state[8], state[9] = nobs, negative, same, shifted
+
+    # Row of the series of the position 0 of sums
+    base = row - offset
+    for w in range(windows.size):
+        minimum = max(min_periods[w], 1)
+        for i in range(n):
+            stop = offset + i + 1
+            first = max(stop - windows[w], 0)
+            nobs = sums[4, stop] - sums[4, first]
+            # Start of the block of the last row, splitting the window if
+            # after its first row
+            middle = stop - 1 - (stop - 1 + base) % block
+            split = first
+            n_a = s1_a = s2_a = shift_a = 0.0
+            if middle > first:
+                n_a = sums[4, middle] - sums[4, first]
+                s1_a, s2_a = _prefix_sums(sums, first, middle, False)
+                shift_a, split = sums[7, middle], middle
+            s1_b, s2_b = _prefix_sums(
+                sums, split, stop, (split + base) % block == 0
+            )
+            n_b, shift_b = nobs - n_a, sums[7, stop]
+            mean, m2 = _prefix_moments(
+                n_a, s1_a, s2_a, shift_a, n_b, s1_b, s2_b, shift_b
+            )
+            negative = sums[5, stop] - sums[5, first]
+            if negative == 0 and mean < 0:
+                mean = 0.0
+            elif negative == nobs and mean > 0:
+                mean = 0.0
+            var = np.nan
+            if nobs > 1:
+                var = m2 / (nobs - 1)
+                if sums[6, stop] >= nobs:
+                    var = 0.0
+            for c in range(codes.size):
+                code = codes[c]
+                if code == _SUM:
+                    if nobs < min_periods[w]:
+                        out[w, c, i] = np.nan
+                    elif nobs:
+                        out[w, c, i] = (s1_a + n_a * shift_a) + (
+                            s1_b + n_b * shift_b
+                        )
+                    else:
+                        out[w, c, i] = 0.0
+                elif nobs < minimum:
+                    out[w, c, i] = np.nan
+                elif code == _MEAN:
+                    out[w, c, i] = mean
+                elif code == _STD:
+                    out[w, c, i] = np.sqrt(var)
+                else:
+                    out[w, c, i] = var
+
+
+@njit(cache=True)
+def _roll_prefix_block(
+    values, row, offset, windows, min_periods, codes, state, sums
+):
+    out = np.empty(
+        (values.shape[0], windows.size, codes.size, values.shape[1])
+    )
+    for j in range(values.shape[0]):
+        _roll_prefix(
+            values[j],
+            row,
+            offset,
+            windows,
+            min_periods,
+            codes,
+            out[j],
+            state[j],
+            sums[j],
+        )
+    return out
+
+
+@njit(cache=True)
+def _offset_start(times, base, row, first, offset):
+    """Starts of the windows (t - offset, t] of the rows from the position
+    row on, in a two-pointer sweep from first, the start of the previous
+    window. times holds the sorted times from the position base on"""
+    start = np.empty(times.size - (row - base), np.int64)
+    for i in range(start.size):
+        limit = times[row - base + i] - offset
+        while times[first - base] <= limit:
+            first += 1
+        start[i] = first
+    return start
+
+
+@njit(cache=True)
+def _roll_order(x, base, first, stop, nodes, links):
+    """Fills the values in order (see _roll_column) of each column with its
+    non-NaN rows in [first, stop), x holding the rows from the position base
+    on"""
+    levels = links.shape[2]
+    scratch = np.empty((2, levels), np.int64)
+    for c in range(x.shape[0]):
+        if links.shape[1] > 1:
+            mask = nodes.shape[1] - 1
+            for j in range(first[c], stop[c]):
+                value = x[c, j - base]
+                if not np.isnan(value):
+                    _skiplist_insert(
+                        nodes[c],
+                        links[c],
+                        j & mask,
+                        value,
+                        _height(j & mask, levels),
+                        scratch[0],
+                        scratch[1],
+                    )
+        else:
+            low, high = first[c] - base, stop[c] - base
+            window = np.sort(x[c, low:high][~np.isnan(x[c, low:high])])
+            nodes[c, : window.size] = window
+
+
+@njit(cache=True)
+def _pairs_update(row, shift, pairs, scratch, sign):
+    """Adds (sign 1) or removes (sign -1) a row of values from the running
+    sums of the pairs of columns (see _roll_pairs). The NaN are zeroed and
+    masked out, so the loops have no branch"""
+    k = row.size
+    d, valid = scratch[0], scratch[1]
+    for a in range(k):
+        value = row[a] - shift[a]
+        valid[a] = 0.0 if np.isnan(value) else 1.0
+        d[a] = 0.0 if np.isnan(value) else value
+    p = 0
+    for a in range(k):
+        if valid[a]:
+            da = sign * d[a]
+            da2 = da * d[a]
+            for b in range(a, k):
+                q = p + b - a
+                pairs[0, q] += sign * valid[b]
+                pairs[1, q] += da * d[b]
+                pairs[2, q] += da * valid[b]
+                pairs[3, q] += sign * d[b]
+                pairs[4, q] += da2 * valid[b]
+                pairs[5, q] += sign * d[b] * d[b]
+        p += k - a
+
+
+@njit(cache=True)
+def _roll_pairs(x, base, start, end, min_periods, corr, out, state):
+    """Rolling covariance (or correlation, with corr) of every pair of
+    columns over the windows [start[i], end[i]) (absolute row positions,
+    both non-decreasing), over the rows where both values are non-NaN, as
+    pandas. Every row is added and removed once from running sums of the
+    pairs (a, b), a <= b: count and sums of da db, da, db, da² and db², d
+    being the values shifted by the first non-NaN value of their column,
+    limiting the cancellation. x, of shape (rows, columns), holds the rows
+    from the position base on, and state (see _roll_pairs_state) is updated
+    in place, so a later call resumes the sweep. out has shape (windows,
+    columns, columns)"""
+    k = x.shape[1]
+    pairs, shift, bounds = state
+    scratch = np.empty((2, k))
+    last_start, last_end = bounds[0], bounds[1]
+    for i in range(start.size):
+        first, stop = start[i], end[i]
+        for j in range(last_start, min(first, last_end)):
+            _pairs_update(x[j - base], shift, pairs, scratch, -1.0)
+        for j in range(max(first, last_end), stop):
+            for a in range(k):
+                if np.isnan(shift[a]):
+                    shift[a] = x[j - base, a]
+            _pairs_update(x[j - base], shift, pairs, scratch, 1.0)
+        last_start, last_end = first, stop
+
+        p = 0
+        for a in range(k):
+            for b in range(a, k):
+                n = pairs[0, p]
+                result = np.nan
+                if not n:
+                    # An empty window drops the rounding residue of the sums
+                    pairs[1:, p] = 0.0
+                elif n >= min_periods and n > 1:
+                    sa, sb = pairs[2, p], pairs[3, p]
+                    c = pairs[1, p] - sa * sb / n
+                    if not corr:
+                        result = c / (n - 1)
+                    else:
+                        va = pairs[4, p] - sa * sa / n
+                        vb = pairs[5, p] - sb * sb / n
+                        # A constant window, up to the rounding, is NaN
+                        if va > 1e-14 * pairs[4, p] and (
+                            vb > 1e-14 * pairs[5, p]
+                        ):
+                            result = 1.0 if a == b else c / np.sqrt(va * vb)
+                out[i, a, b] = out[i, b, a] = result
+                p += 1
+    bounds[0], bounds[1] = last_start, last_end
+
+
+@njit(cache=True)
+def _pairs_select(values, top_k, threshold):
+    """Positions (row, a, b) of the kept pairs of the (rows, columns,
+    columns) matrices, b != a and |value| > threshold: the top_k partners b
+    of each column a, from the strongest one, or without top_k (0) the pairs
+    a < b"""
+    n, k = values.shape[0], values.shape[1]
+    kept = np.empty((max(n * k * min(top_k or 1, k), 1), 3), np.int64)
+    size = 0
+    # Partners of a column and their magnitudes, from the strongest one
+    best = np.empty(k, np.int64)
+    magnitude = np.empty(k)
+    for t in range(n):
+        for a in range(k):
+            filled = 0
+            # Magnitude to exceed, the one of the last partner once full
+            floor = threshold
+            for b in range(a + 1 if not top_k else 0, k):
+                m = abs(values[t, a, b])
+                if not m > floor or b == a:
+                    continue
+                h = filled if filled < top_k or not top_k else top_k - 1
+                while top_k and h and magnitude[h - 1] < m:
+                    best[h] = best[h - 1]
+                    magnitude[h] = magnitude[h - 1]
+                    h -= 1
+                best[h] = b
+                magnitude[h] = m
+                if filled < top_k or not top_k:
+                    filled += 1
+                if filled == top_k:
+                    floor = magnitude[top_k - 1]
+
+            if size + filled > len(kept):
+                grown = np.empty((2 * (size + filled), 3), np.int64)
+                grown[:size] = kept[:size]
+                kept = grown
+            for h in range(filled):
+                kept[size, 0] = t
+                kept[size, 1] = a
+                kept[size, 2] = best[h]
+                size += 1
+    return kept[:size]
+
+
+# Statistics of the prefix sums path of several windows
+_PREFIX_TYPES = (_SUM, _MEAN, _VAR, _STD)
+
+
+def _roll_types(roll_type) -> (np.ndarray, np.ndarray, [str]):
+    """Codes, quantiles and labels of the statistics in roll_type"""
+    codes, qs, labels = [], [], []
+    for stat in roll_type:
+        q = 0.5
+        if isinstance(stat, tuple):
+            stat, q = stat
+            if not 0 <= q <= 1:
+                raise ValueError(f"quantile {q} out of [0, 1]")
+        if stat not in ROLL_TYPES:
+            raise ValueError(f"unsupported roll_type {stat}")
+        codes.append(ROLL_TYPES.index(stat))
+        qs.append(q)
+        labels.append(f"quantile_{q}" if stat == "quantile" else stat)
+    return np.array(codes, np.int64), np.array(qs, np.float64), labels
+
+
+# Smallest window of which the median and quantiles use a skiplist rather
+# than a sorted buffer (measured crossover)
+_SKIPLIST_WINDOW = 400
+
+
+def _skiplist(n_columns: int, size: int, window: int) -> np.ndarray:
+    """Links of empty skiplists of size nodes (the head alone when size is
+    0), with enough levels for window values: the head links to the end
+    (-1), with a width of 1"""
+    links = np.zeros(
+        (n_columns, size + 1, int(window).bit_length() or 1, 2), np.int64
+    )
+    links[:, size, :, 0] = -1
+    links[:, size, :, 1] = 1
+    return links
+
+
+def _offset(window) -> int:
+    """Length in nanoseconds of an offset window (e.g. "5min"), None for a
+    window of a number of rows
+
+    Raises
+    ------
+    ValueError
+        Non-fixed (e.g. "1M") or non-positive offset
+    """
+    if isinstance(window, (int, np.integer)):
+        return None
+    offset = to_offset(window).nanos
+    if offset <= 0:
+        raise ValueError(f"window {window} must be positive")
+    return offset
+
+
+def _times(index: pd.Index) -> np.ndarray:
+    """Times of a datetime index, in nanoseconds
+
+    Raises
+    ------
+    ValueError
+        Index not a sorted datetime index
+    """
+    if not (
+        isinstance(index, pd.DatetimeIndex) and index.is_monotonic_increasing
+    ):
+        raise ValueError("offset windows need a sorted datetime index")
+    return index.values.astype("datetime64[ns]").view(np.int64)
+
+
+def _chunk_times(index: pd.Index, state: dict) -> np.ndarray:
+    """Times of the index of a chunk, in nanoseconds, following the times
+    of the rows carried in state
+
+    Raises
+    ------
+    ValueError
+        Index not a sorted datetime index
+    """
+    times = _times(index)
+    if len(times) and len(state["times"]) and times[0] < state["times"][-1]:
+        raise ValueError("offset windows need a sorted datetime index")
+    return times
+
+
+def _roll_engine(n_columns: int, rows: int, median: bool) -> dict:
+    """Empty state of the sweep of windows of up to rows rows: per column,
+    the running sums (floats), counters (ints), monotonic deques of the min
+    and max and values in order (nodes and links, only sized for the median
+    and quantiles, see _roll_column)"""
+    # Rings of a power of two size, larger than the window
+    size = 1 << int(rows).bit_length()
+    nodes = links = 0
+    if median and rows >= _SKIPLIST_WINDOW:
+        nodes = links = size
+    elif median:
+        nodes = rows
+    floats = np.zeros((n_columns, 14))
+    floats[:, 4] = np.nan
+    return {
+        "floats": floats,
+        "ints": np.zeros((n_columns, 10), np.int64),
+        "deques": np.zeros((n_columns, 2, size), np.int64),
+        "nodes": np.zeros((n_columns, nodes)),
+        "links": _skiplist(n_columns, links, rows),
+    }
+
+
+def _roll_fit(
+    engine: dict, x: np.ndarray, base: int, rows: int, median: bool
+):
+    """Grows the engine (in place) to windows of rows rows, at least doubling
+    it: the deques are moved to the larger rings and the values in order are
+    rebuilt from the rows of the current window, held by x from the position
+    base on"""
+    deques, nodes = engine["deques"], engine["nodes"]
+    size = deques.shape[2]
+    if rows < size and (
+        not median or nodes.shape[1] >= min(rows, _SKIPLIST_WINDOW)
+    ):
+        return
+
+    ints = engine["ints"]
+    grown = _roll_engine(len(ints), max(rows, size), median)
+    grown["floats"][:] = engine["floats"]
+    grown["ints"][:] = ints
+    mask = grown["deques"].shape[2] - 1
+    for column in range(len(ints)):
+        for h, head in enumerate((5, 7)):
+            kept = np.arange(ints[column, head], ints[column, head + 1])
+            grown["deques"][column, h, kept & mask] = deques[
+                column, h, kept & (size - 1)
+            ]
+    if median:
+        _roll_order(
+            x, base, ints[:, 3], ints[:, 4], grown["nodes"], grown["links"]
+        )
+    engine.update(grown)
+
+
+def _roll_state(
+    n_columns: int, windows: [int or str], codes: np.ndarray
+) -> dict:
+    """Empty state of a rolling sweep: the position of the next row and, with
+    several windows of prefix statistics, the running prefix sums of each
+    column and the prefixes of the last rows; otherwise the rows (and times)
+    of the current windows, the start of the last window of each offset
+    window and an engine per window (see _roll_engine, grown by _roll_fit
+    for the offset windows)"""
+    offsets = [_offset(_) for _ in windows]
+    if (
+        len(windows) > 1
+        and offsets.count(None) == len(windows)
+        and np.isin(codes, _PREFIX_TYPES).all()
+    ):
+        prefix = np.zeros((n_columns, 10))
+        prefix[:, 4] = np.nan
+        return {
+            "row": 0,
+            "prefix": prefix,
+            "sums": np.zeros((n_columns, 8, 1)),
+        }
+
+    median = np.isin(codes, (_MEDIAN, _QUANTILE)).any()
+    return {
+        "row": 0,
+        "tail": np.empty((n_columns, 0)),
+        "times": np.empty(0, np.int64),
+        "start": [0] * len(windows),
+        "engines": [
+            _roll_engine(n_columns, 0 if offset else window, median)
+            for window, offset in zip(windows, offsets)
+        ],
+    }
+
+
+def _roll_rows(
+    values: np.ndarray,
+    windows: [int or str],
+    codes: np.ndarray,
+    qs: np.ndarray,
+    state: dict,
+    times: np.ndarray = None,
+) -> np.ndarray:
+    """Rolls the next rows of a series, given as a (columns, rows) block with
+    their times in nanoseconds (for the offset windows), resuming the sweep
+    from state (updated in place)
+
+    Returns
+    -------
+    np.ndarray
+        Float64 array of shape (columns, windows, codes, rows)
+    """
+    row, n_rows = state["row"], values.shape[1]
+    state["row"] += n_rows
+
+    if "sums" in state:
+        sizes = np.array(windows, np.int64)
+        carried = state["sums"]
+        offset = carried.shape[2] - 1
+        sums = np.empty(carried.shape[:2] + (offset + 1 + n_rows,))
+        sums[:, :, : offset + 1] = carried
+        result = _roll_prefix_block(
+            values, row, offset, sizes, sizes, codes, state["prefix"], sums
+        )
+        keep = min(row + n_rows, max(windows)) + 1
+        state["sums"] = sums[:, :, -keep:].copy()
+        return result
+
+    x = np.concatenate((state["tail"], values), axis=1)
+    base = row - state["tail"].shape[1]
+    if times is not None:
+        times = np.concatenate((state["times"], times))
+    median = np.isin(codes, (_MEDIAN, _QUANTILE)).any()
+    end = np.arange(row + 1, row + n_rows + 1, dtype=np.int64)
+    keep = base if not n_rows else row + n_rows
+    results = []
+    for w, (window, engine) in enumerate(zip(windows, state["engines"])):
+        offset = _offset(window)
+        if offset is None:
+            start = np.maximum(end - window, 0)
+            min_periods = window
+        else:
+            # As pandas, the windows (t - offset, t] need a single value
+            start = _offset_start(times, base, row, state["start"][w], offset)
+            min_periods = 1
+            if n_rows:
+                # Rows between the last window start and the window end
+                last = np.concatenate(([state["start"][w]], start[:-1]))
+                _roll_fit(engine, x, base, int((end - last).max()), median)
+                state["start"][w] = int(start[-1])
+        if n_rows:
+            keep = min(keep, int(start[-1]))
+        results.append(
+            _roll_block(
+                x,
+                base,
+                start,
+                end,
+                min_periods,
+                codes,
+                qs,
+                engine["floats"],
+                engine["ints"],
+                engine["deques"],
+                engine["nodes"],
+                engine["links"],
+            )
+        )
+    kept = slice(keep - base, None)
+    state["tail"] = x[:, kept].copy()
+    if times is not None:
+        state["times"] = times[kept].copy()
+    return np.stack(results, axis=1)
+
+
+def _roll_chunks(
+    chunks,
+    window: int or str or [int or str],
+    roll_type: str or [str],
+    headers: [str],
+    codes: np.ndarray,
+    qs: np.ndarray,
+    labels: [str],
+):
+    """Rolls a series given as an iterable of dataframes, yielding the result
+    of each one"""
+    windows = window if isinstance(window, list) else [window]
+    offsets = any(_offset(_) for _ in windows)
+    state = None
+    for data_frame in chunks:
+        if headers:
+            data_frame = data_frame.loc[:, headers]
+        if state is None:
+            state = _roll_state(len(data_frame.columns), windows, codes)
+        times = _chunk_times(data_frame.index, state) if offsets else None
+        result = _roll_rows(
+            np.ascontiguousarray(data_frame.to_numpy(dtype=np.float64).T),
+            windows,
+            codes,
+            qs,
+            state,
+            times,
+        )
+
+        levels = [data_frame.columns]
+        if isinstance(window, list):
+            levels.append(windows)
+        if isinstance(roll_type, list):
+            levels.append(labels)
+        columns = (
+            pd.MultiIndex.from_product(levels)
+            if len(levels) > 1
+            else data_frame.columns
+        )
+        yield pd.DataFrame(
+            result.reshape(len(columns), len(data_frame)).T,
+            index=data_frame.index,
+            columns=columns,
+        )
+
+
+# Statistics of the pairs of columns, rolled apart from the other ones
+PAIR_TYPES = ("cov", "corr")
+
+# Rows rolled at a time when the pairs are filtered, bounding the memory of
+# the dense matrices
+_PAIRS_ROWS = 4096
+
+
+def _roll_pairs_state(n_columns: int) -> dict:
+    """Empty state of a rolling sweep of the pairs of columns: the position
+    of the next row, the rows (and times) from the last window start, the
+    start of the last window of an offset window and the kernel state of
+    _roll_pairs: the sums of the pairs (a, b), a <= b, the shifts of the
+    columns and the bounds of the last window"""
+    return {
+        "row": 0,
+        "tail": np.empty((0, n_columns)),
+        "times": np.empty(0, np.int64),
+        "start": 0,
+        "pairs": np.zeros((6, n_columns * (n_columns + 1) // 2)),
+        "shift": np.full(n_columns, np.nan),
+        "bounds": np.zeros(2, np.int64),
+    }
+
+
+def _roll_pairs_rows(
+    values: np.ndarray,
+    window: int or str,
+    corr: bool,
+    state: dict,
+    times: np.ndarray = None,
+) -> np.ndarray:
+    """Rolls the pairs of columns of the next rows of a series, given as a
+    (rows, columns) block with their times in nanoseconds (for an offset
+    window), resuming the sweep from state (updated in place)
+
+    Returns
+    -------
+    np.ndarray
+        Float64 array of shape (rows, columns, columns)
+    """
+    row, n_rows = state["row"], len(values)
+    state["row"] += n_rows
+
+    x = np.concatenate((state["tail"], values))
+    base = row - len(state["tail"])
+    end = np.arange(row + 1, row + n_rows + 1, dtype=np.int64)
+    offset = _offset(window)
+    if offset is None:
+        start = np.maximum(end - window, 0)
+        min_periods = window
+    else:
+        times = np.concatenate((state["times"], times))
+        start = _offset_start(times, base, row, state["start"], offset)
+        min_periods = 1
+    result = np.empty((n_rows, values.shape[1], values.shape[1]))
+    _roll_pairs(
+        x,
+        base,
+        start,
+        end,
+        min_periods,
+        corr,
+        result,
+        (state["pairs"], state["shift"], state["bounds"]),
+    )
+
+    keep = int(start[-1]) if n_rows else base
+    state["start"] = keep
+    kept = slice(keep - base, None)
+    state["tail"] = x[kept].copy()
+    if times is not None:
+        state["times"] = times[kept].copy()
+    return result
+
+
+def _pairs_frame(
+    values: np.ndarray,
+    index: pd.Index,
+    columns: pd.Index,
+    name: str,
+    top_k: int = None,
+    threshold: float = None,
+) -> pd.DataFrame:
+    """Dataframe of the (rows, columns, columns) matrices of the pairs of
+    columns: indexed by (index, column) and backed by values, or, with
+    top_k or threshold, in long format with a (col_a, col_b, name) row per
+    kept pair"""
+    if top_k is None and threshold is None:
+        return pd.DataFrame(
+            values.reshape(-1, len(columns)),
+            index=pd.MultiIndex.from_product([index, columns]),
+            columns=columns,
+        )
+
+    kept = _pairs_select(
+        values, top_k or 0, -1.0 if threshold is None else threshold
+    )
+    rows, a, b = kept[:, 0], kept[:, 1], kept[:, 2]
+    columns = np.asarray(columns)
+    return pd.DataFrame(
+        {"col_a": columns[a], "col_b": columns[b], name: values[rows, a, b]},
+        index=index[rows],
+    )
+
+
+def _roll_pairs_chunks(
+    chunks,
+    window: int or str,
+    roll_type: str,
+    headers: [str],
+    top_k: int,
+    threshold: float,
+):
+    """Rolls the covariance or correlation of the pairs of columns of a
+    series given as an iterable of dataframes, yielding the result of each
+    one"""
+    offset = _offset(window)
+    state = None
+    for data_frame in chunks:
+        if headers:
+            data_frame = data_frame.loc[:, headers]
+        if state is None:
+            state = _roll_pairs_state(len(data_frame.columns))
+        times = _chunk_times(data_frame.index, state) if offset else None
+        result = _roll_pairs_rows(
+            np.ascontiguousarray(data_frame.to_numpy(dtype=np.float64)),
+            window,
+            roll_type == "corr",
+            state,
+            times,
+        )
+        yield _pairs_frame(
+            result,
+            data_frame.index,
+            data_frame.columns,
+            roll_type,
+            top_k,
+            threshold,
+        )
 
 
 def roll(
     data_frame: pd.DataFrame,
-    window: int,
-    roll_type: str = "mean",
+    window: int or str or [int or str],
+    roll_type: str or [str] = "mean",
     headers: [str] = None,
+    top_k: int = None,
+    threshold: float = None,
 ) -> pd.DataFrame:
     """This function Provide rolling window calculations. This is a adapted
     rolling function of pandas package.
 
+    All the statistics in roll_type are computed in a single sweep of each
+    column, sharing the running state of the window (compensated sums,
+    moments, monotonic deques for the min and max and an indexable skiplist
+    for the median and quantiles, updated in O(log window), or a sorted
+    buffer below 400 rows). As pandas, a window with less than window
+    non-NaN values is NaN.
+
+    An offset window (e.g. "5min") spans the rows of the times (t - offset,
+    t] of a sorted datetime index, for irregularly sampled series. Its
+    starts are found in a two-pointer sweep over the times, so the cost
+    stays linear in rows, and all the statistics are supported. As pandas,
+    a window of a single non-NaN value is valid.
+
+    The covariance and correlation of every pair of columns ('cov' and
+    'corr', as pandas.DataFrame.rolling(window).cov() and .corr()) are
+    computed in one sweep from running sums of the products of each pair,
+    over the rows where both values are non-NaN, and returned as the
+    (rows, headers, headers) matrices, indexed by (index, header). A
+    correlation of a constant window is NaN. With top_k or threshold only
+    the strongest pairs are kept, in long format, the matrices being
+    computed 4096 rows at a time.
+
+    With a list of windows, the sum, mean, variance and standard deviation
+    of every window size are derived from the same compensated prefix sums
+    of each column, in about the time of a single window. The prefix sums
+    restart every block of rows, shifted by its first value, so they follow
+    the level of a drifting series. The other statistics are computed window
+    by window.
+
+    In chunked mode (data_frame given as an iterable of dataframes, as
+    returned by pd.read_csv with chunksize) the sweep state and the last
+    rows of the window are carried from a chunk to the next, and the results
+    are yielded chunk by chunk, equal to the ones of the whole dataframe.
+
     Parameters
     ----------
     data_frame : pd.DataFrame
         input dataframe
-    window : int
-        See pandas.DataFrame.rolling
-    roll_type : str, optional
-        {‘mean’, ‘var’, 'std'}, by default "mean"
+    window : int or str or [int or str]
+        See pandas.DataFrame.rolling: a number of rows or a fixed offset
+        (e.g. "5min", over the datetime index), or a list of them
+    roll_type : str or [str], optional
+        {'sum', 'mean', 'var', 'std', 'min', 'max', 'median', 'quantile',
+        'skew', 'kurt'} or a list of them, by default "mean". A quantile is
+        given as ('quantile', q) ('quantile' alone is the median). Or
+        {'cov', 'corr'} alone, over a single window
     headers : [type], optional
         chosen dataframe headers, by default None
+    top_k : int, optional
+        For 'cov' and 'corr', keeps the top_k partners of each header of
+        largest absolute value, by default None
+    threshold : float, optional
+        For 'cov' and 'corr', keeps the pairs of absolute value above
+        threshold, by default None. Alone, each pair is kept once
 
     Returns
     -------
     pd.DataFrame
-        a Window or Rolling sub-classed for the particular operation
-    """
-    rolling = {
-        "mean": lambda roll: roll.mean(),
-        "var": lambda roll: roll.var(),
-        "std": lambda roll: roll.std(),
-    }
+        a Window or Rolling sub-classed for the particular operation, with
+        (header, window, statistic) columns, without the window level when
+        window is not a list and without the statistic level when roll_type is
+        not a list. For 'cov' and 'corr', a dataframe of (index, header) rows
+        and header columns, or with top_k or threshold a dataframe of
+        (col_a, col_b, roll_type) columns, indexed by the index. A generator
+        of them in chunked mode
 
-    if headers:
-        data_frame = data_frame.loc[:, headers]
-    return rolling[roll_type](data_frame.rolling(window))
+    Raises
+    ------
+    ValueError
+        Unsupported roll_type, quantile out of [0, 1], non-fixed or
+        non-positive offset, offset window over an unsorted or non-datetime
+        index, 'cov' or 'corr' with other roll_type or several windows,
+        top_k or threshold without them or top_k lower than 1, window neither
+        a number of rows nor an offset (or an empty list of them), negative
+        number of rows
+    """
+    windows = window if isinstance(window, list) else [window]
+    if not windows:
+        raise ValueError("window must be given")
+    for _ in windows:
+        if isinstance(_, bool) or not isinstance(_, (int, np.integer, str)):
+            raise ValueError(
+                f"window {_!r} must be a number of rows (int) or an offset"
+            )
+        if not isinstance(_, str) and _ < 0:
+            raise ValueError(f"window {_} must be at least 0")
+    if roll_type in PAIR_TYPES:
+        if isinstance(window, list):
+            raise ValueError(f"{roll_type} needs a single window")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        chunks = data_frame
+        if isinstance(data_frame, pd.DataFrame):
+            chunks = [data_frame]
+            if top_k is not None or threshold is not None:
+                # The matrices are computed a block of rows at a time
+                chunks = [
+                    data_frame.iloc[slice(_, _ + _PAIRS_ROWS)]
+                    for _ in range(0, len(data_frame), _PAIRS_ROWS)
+                ] or chunks
+        result = _roll_pairs_chunks(
+            chunks, window, roll_type, headers, top_k, threshold
+        )
+        if isinstance(data_frame, pd.DataFrame):
+            return pd.concat(result) if len(chunks) > 1 else next(result)
+        return result
+    if isinstance(roll_type, list) and set(roll_type) & set(PAIR_TYPES):
+        raise ValueError("cov and corr can not be combined with roll_type")
+    if top_k is not None or threshold is not None:
+        raise ValueError("top_k and threshold are only for cov and corr")
+    codes, qs, labels = _roll_types(
+        roll_type if isinstance(roll_type, list) else [roll_type]
+    )
+    if isinstance(data_frame, pd.DataFrame):
+        return next(
+            _roll_chunks(
+                [data_frame], window, roll_type, headers, codes, qs, labels
+            )
+        )
+    return _roll_chunks(
+        data_frame, window, roll_type, headers, codes, qs, labels
+    )
 
 
 if __name__ == "__main__":
     import argparse
+    import sys
 
     # construct the argument parser and parse the arguments
     ap = argparse.ArgumentParser()
@@ -59,17 +1359,40 @@ if __name__ == "__main__":
         "-o",
         "--orient",
         type=str,
-        default="columns",
         help="""format json output
         {'split', 'records', 'index', 'values', 'table', 'columns'}
-        (default: 'columns')""",
+        (default: 'columns', 'records' with chunksize)""",
     )
     ap.add_argument(
         "-t",
         "--roll_type",
         type=str,
-        default="mean",
-        help="""{‘mean’, ‘var’, 'std'} (default: {"mean"}).""",
+        nargs="+",
+        default=["mean"],
+        help="""{'sum', 'mean', 'var', 'std', 'min', 'max', 'median',
+        'quantile', 'skew', 'kurt'}, several are computed in one pass, or
+        {'cov', 'corr'} of every pair of headers (default: {"mean"}).""",
+    )
+    ap.add_argument(
+        "-q",
+        "--quantile",
+        type=float,
+        default=0.5,
+        help="quantile of the 'quantile' roll_type (default: 0.5).",
+    )
+    ap.add_argument(
+        "-k",
+        "--top-k",
+        type=int,
+        help="""For cov and corr, keeps the top k partners of each header
+        (default: None).""",
+    )
+    ap.add_argument(
+        "-th",
+        "--threshold",
+        type=float,
+        help="""For cov and corr, keeps the pairs of absolute value above
+        threshold (default: None).""",
     )
     ap.add_argument(
         "-pd",
@@ -93,12 +1416,43 @@ if __name__ == "__main__":
         nargs="*",
         help="an string for the header in the dataset",
     )
-    ap.add_argument("--window", type=int, required=True)
+    ap.add_argument(
+        "--window",
+        type=str,
+        nargs="+",
+        required=True,
+        help="""Size(s) of the moving window, in rows or as an offset over the
+        datetime index (e.g. 5min), several sizes in rows share one pass for
+        sum, mean, var and std.""",
+    )
+    ap.add_argument(
+        "-c",
+        "--chunksize",
+        type=int,
+        help="""Number of rows read per chunk. The dataset is streamed and the
+        output is written chunk by chunk in json lines, so only the 'records'
+        orient can be used (default: None).""",
+    )
     args = vars(ap.parse_args())
 
+    # Chunks are written as json lines, one record per line
+    if args["chunksize"] and args["orient"] not in (None, "records"):
+        ap.error("argument -o/--orient: only 'records' with -c/--chunksize")
+
+    # Windows in rows are integers, the other ones offsets
+    window = [int(_) if _.isdigit() else _ for _ in args["window"]]
+
     # If exist parse_dates, creates a structure with column name datetime
     if args["parse_dates"]:
         args["parse_dates"] = {"datetime": args["parse_dates"]}
+        # The offset windows are over the datetime index
+        if not args["index"] and not all(isinstance(_, int) for _ in window):
+            args["index"] = ["datetime"]
+
+    roll_type = [
+        ("quantile", args["quantile"]) if _ == "quantile" else _
+        for _ in args["roll_type"]
+    ]
 
     # Apply
     result = roll(
@@ -106,15 +1460,36 @@ if __name__ == "__main__":
             args["dataset"],
             parse_dates=args["parse_dates"],
             index_col=args["index"],
+            chunksize=args["chunksize"],
         ),
-        window=args["window"],
-        roll_type=args["roll_type"],
+        window=window if len(window) > 1 else window[0],
+        roll_type=roll_type if len(roll_type) > 1 else roll_type[0],
         headers=args["headers"],
+        top_k=args["top_k"],
+        threshold=args["threshold"],
     )
 
-    # Output in json format
+    # Output in json lines format, chunk by chunk
+    if args["chunksize"]:
+        out = open(args["file_out"], "w") if args["file_out"] else sys.stdout
+        for chunk in result:
+            out.write(
+                chunk.reset_index()
+                .to_json(force_ascii=False, orient="records", lines=True)
+                .rstrip("\n")
+                + "\n"
+            )
+        if out is not sys.stdout:
+            out.close()
+        sys.exit()
+
+    # Output in json format, the pairs with their rows
+    if roll_type[0] in PAIR_TYPES:
+        result = result.reset_index()
     result = result.to_json(
-        args.get("file_out"), force_ascii=False, orient=args["orient"]
+        args.get("file_out"),
+        force_ascii=False,
+        orient=args["orient"] or "columns",
     )
     if result:
         print(result)
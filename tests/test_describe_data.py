@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from analytics_utils.describe_data import describe_data
+from analytics_utils.DescribeSummary import DescribeSummary
+from analytics_utils.IncrementalDescriber import IncrementalDescriber
+
+
+DATA_FRAME = pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": [4.0, 5.0, np.nan]})
+
+
+def test_describe_data_empty_frame():
+    result = describe_data(DATA_FRAME.iloc[:0], lang="en")
+    assert list(result.index) == ["a", "b"]
+    assert result.drop(columns=["count", "NaNs"]).isna().all().all()
+    assert (result["count"] == 0).all() and (result["NaNs"] == 0).all()
+
+
+def test_summaries_ignore_empty_updates():
+    expected = DescribeSummary(DATA_FRAME).finalize()
+    for summary in (DescribeSummary, IncrementalDescriber):
+        result = summary(DATA_FRAME).update(DATA_FRAME.iloc[:0]).finalize()
+        pd.testing.assert_frame_equal(result, expected)
+    result = DescribeSummary(DATA_FRAME.iloc[:0]).finalize(lang="en")
+    assert result["max"].isna().all() and (result["count"] == 0).all()
@@ -0,0 +1,11 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_utils.ewm import ewm
+
+
+@pytest.mark.parametrize("decay", ["com", "span", "halflife", "alpha"])
+def test_ewm_rejects_empty_decays(decay):
+    with pytest.raises(ValueError):
+        ewm(pd.DataFrame({"x": np.arange(10.0)}), **{decay: []})
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analytics_utils.roll import roll
+
+
+def test_roll_prefix_variance_of_drifting_series():
+    rng = np.random.default_rng(0)
+    n = 200000
+    values = np.linspace(0, 1e6, n) + rng.normal(size=n)
+    result = roll(pd.DataFrame({"x": values}), [5, 20], ["mean", "var"])
+    for window in (5, 20):
+        windows = sliding_window_view(values, window)
+        full = slice(window - 1, None)
+        np.testing.assert_allclose(
+            result[("x", window, "var")].to_numpy()[full],
+            windows.var(axis=1, ddof=1),
+            rtol=1e-7,
+        )
+        np.testing.assert_allclose(
+            result[("x", window, "mean")].to_numpy()[full],
+            windows.mean(axis=1),
+            rtol=1e-12,
+        )
+
+
+@pytest.mark.parametrize("window", [3.0, [3, 4.0], None, True, [], -1])
+def test_roll_rejects_invalid_windows(window):
+    with pytest.raises(ValueError):
+        roll(pd.DataFrame({"x": np.arange(10.0)}), window)